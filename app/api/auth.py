@@ -1,21 +1,52 @@
+import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.db.database import async_session_maker
+from app.db.database import get_db, release
 from app.db import models, schemas
+from app.db.principals import Principal, principals
 from app.config import utils
+from app.config.config import settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
+bearer = HTTPBearer(auto_error=False)
 
-async def get_db():
-    async with async_session_maker() as session:
-        yield session
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """The user behind a bearer token that is still logged in.
+
+    Served from the per-worker principal cache, so an authorized request
+    normally runs no query and checks out no connection.
+    """
+    unauthorized = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if credentials is None:
+        raise unauthorized
+    try:
+        payload = jwt.decode(credentials.credentials, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, ValueError):
+        raise unauthorized
+    principal = await principals.authorize(db, user_id, credentials.credentials)
+    if principal is None:
+        raise unauthorized
+    return principal
 
 @router.post("/register", response_model=schemas.UserOut)
 async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.User).filter(models.User.username == user.username))
     if result.scalar():
         raise HTTPException(status_code=400, detail="Username already exists")
+    await release(db)
     hashed_pw = utils.hash_password(user.password)
     new_user = models.User(username=user.username, hashed_password=hashed_pw)
     db.add(new_user)
@@ -27,9 +58,11 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db))
 async def login(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(models.User).filter(models.User.username == user.username))
     db_user = result.scalar()
+    await release(db)
     if not db_user or not utils.verify_password(user.password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = utils.create_access_token({"sub": str(db_user.id)})
+    # jti keeps two logins within the same second from minting the same token
+    token = utils.create_access_token({"sub": str(db_user.id), "jti": uuid.uuid4().hex})
     new_session = models.TokenSession(user_id=db_user.id, token=token)
     db.add(new_session)
     await db.commit()
@@ -43,5 +76,33 @@ async def logout(token: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Session not found")
     await db.delete(session)
     await db.commit()
+    principals.invalidate(session.user_id)
     return {"message": "Logged out successfully"}
 
+@router.get("/me", response_model=schemas.UserOut)
+async def me(user: Principal = Depends(get_current_user)):
+    return user
+
+@router.post("/change-password")
+async def change_password(
+    body: schemas.PasswordChange,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer),
+    user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    db_user = await db.get(models.User, user.id)
+    await release(db)
+    if db_user is None or not utils.verify_password(body.current_password, db_user.hashed_password):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    db_user.hashed_password = utils.hash_password(body.new_password)
+    # Every other login ends; the token making this request stays valid
+    await db.execute(
+        delete(models.TokenSession).where(
+            models.TokenSession.user_id == user.id,
+            models.TokenSession.token != credentials.credentials,
+        )
+    )
+    await db.commit()
+    principals.invalidate(user.id)
+    return {"message": "Password changed"}
+
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import timedelta
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.config import settings
+from app.db import database, models
+from app.db.changes import COMPACTED, change_notifier
+from app.lifecycle import lifecycle
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+async def read_changes(db: AsyncSession, since: int, limit: int) -> list[dict]:
+    # Served only once settled: a transaction that took a lower id but commits
+    # later would otherwise be skipped by a cursor that already moved past it
+    db_now = await db.scalar(select(func.now()))
+    settled = db_now - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+    result = await db.execute(
+        select(models.ChangeLog.id, models.ChangeLog.entity, models.ChangeLog.entity_id, models.ChangeLog.op,
+               models.ChangeLog.created_at)
+        .where(models.ChangeLog.id > since, models.ChangeLog.created_at <= settled)
+        .order_by(models.ChangeLog.id)
+        .limit(limit)
+    )
+    return [
+        {"cursor": row.id, "entity": row.entity, "entity_id": row.entity_id, "op": row.op,
+         "at": row.created_at.isoformat() if row.created_at else None}
+        for row in result
+    ]
+
+
+# HEAD cursor: take it before a full pull, then sync from it
+@router.get("/head")
+async def changes_head(db: AsyncSession = Depends(database.get_db)):
+    head = await db.scalar(select(func.max(models.ChangeLog.id)))
+    return {"cursor": head or 0}
+
+
+# READ changes after a cursor, optionally waiting for new ones
+@router.get("")
+async def read_changes_since(since: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                             wait: float = Query(0, ge=0), db: AsyncSession = Depends(database.get_db)):
+    oldest = (await db.execute(
+        select(models.ChangeLog.id, models.ChangeLog.op).order_by(models.ChangeLog.id).limit(1)
+    )).first()
+    if oldest is not None and oldest.op == COMPACTED and since < oldest.id:
+        raise HTTPException(status_code=410, detail="Cursor is older than the change log retention; resync in full")
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(wait, settings.CHANGES_MAX_WAIT_SECONDS)
+    while True:
+        changes = [change for change in await read_changes(db, since, limit) if change["op"] != COMPACTED]
+        # Do not park a pooled connection while waiting
+        await database.release(db)
+        remaining = deadline - loop.time()
+        if changes or remaining <= 0 or lifecycle.draining:
+            break
+        await change_notifier.wait(min(remaining, settings.CHANGES_POLL_INTERVAL_SECONDS))
+
+    body = {"changes": changes, "next": changes[-1]["cursor"] if changes else since}
+    return Response(content=orjson.dumps(body), media_type="application/json")
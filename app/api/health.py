@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from app.config.config import settings
+from app.db import database
+from app.db.pool import pool_stats
+from app.jobs import jobs
+from app.middleware.compression import available_encodings, compression_stats
+from app.lifecycle import lifecycle
+from app.render import renderer
+from app.render.scheduler import render_scheduler
+
+router = APIRouter(tags=["health"])
+
+# Paths probed by orchestrators; kept out of admission control and rate limiting
+PROBE_PATHS = ("/healthz", "/readyz")
+
+_last_ping: tuple[float, str | None] | None = None
+
+
+async def ping_database() -> str | None:
+    """``SELECT 1`` on a pooled connection; returns an error message or None.
+
+    The result is reused for READINESS_DB_CACHE_SECONDS so frequent probes
+    from several orchestrators cost at most one query per window.
+    """
+    global _last_ping
+    now = time.monotonic()
+    if _last_ping is not None and now - _last_ping[0] < settings.READINESS_DB_CACHE_SECONDS:
+        return _last_ping[1]
+
+    error = None
+    try:
+        async with asyncio.timeout(settings.READINESS_DB_TIMEOUT_SECONDS):
+            async with database.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except TimeoutError:
+        error = f"ping timed out after {settings.READINESS_DB_TIMEOUT_SECONDS}s"
+    except Exception as e:
+        error = str(e)
+    _last_ping = (time.monotonic(), error)
+    return error
+
+
+# LIVENESS: no dependencies, only proves the event loop answers
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+# READINESS: 503 while starting, draining or unable to serve renders
+@router.get("/readyz")
+async def readyz():
+    db_error = await ping_database()
+    render_queue = renderer.render_queue_depth()
+    checks = {
+        "lifecycle": lifecycle.state == "ready",
+        "database": db_error is None,
+        "render_pool": render_queue < settings.ADMISSION_MAX_RENDER_QUEUE,
+        "base_image": renderer.base_image_cached(),
+    }
+    ready = all(checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "degraded" if lifecycle.state == "ready" and not ready else lifecycle.state,
+            "checks": checks,
+            "database_error": db_error,
+            "render_queue": render_queue,
+            "inflight_requests": lifecycle.inflight,
+            "pending_renders": render_scheduler.pending(),
+            "running_jobs": len(jobs.running()),
+        },
+    )
+
+
+# POOL INTROSPECTION
+@router.get("/debug/pool")
+async def debug_pool():
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    pool = database.engine.pool
+    # Pools without a fixed size (e.g. NullPool) lack some of these counters
+    return {
+        "pool_class": type(pool).__name__,
+        "size": getattr(pool, "size", lambda: None)(),
+        "checked_out": getattr(pool, "checkedout", lambda: None)(),
+        "checked_in": getattr(pool, "checkedin", lambda: None)(),
+        "overflow": getattr(pool, "overflow", lambda: None)(),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout_seconds": getattr(pool, "_timeout", None),
+        "wait": pool_stats.snapshot(),
+    }
+
+
+# COMPRESSION METRICS
+@router.get("/debug/compression")
+async def debug_compression():
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"available": available_encodings(), **compression_stats.snapshot()}
@@ -1,58 +1,78 @@
-import os
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
+from sqlalchemy import delete
 from sqlalchemy.future import select
-from PIL import Image
-from reportlab.pdfgen import canvas
-from app.db import models, schemas, database
+from app.api.serialization import row_response, rows_response
+from app.config.config import settings
+from app.db import models, queries, schemas, database
+from app.db.changes import record_change
+from app.db.stats import item_stats
+from app.events import event_hub
+from app.render.renderer import (
+    VARIANTS, RenderVariant, pdf_key, render_variant, run_render, single_flight, variant_key, variant_keys,
+)
+from app.jobs.renders import complete_render_job
+from app.render.layout import layout_crops, pack, render_layout_pdf
+from app.render.scheduler import render_scheduler
+from app.storage import ObjectNotFound, discard_files, get_storage, normalize_key
 
 router = APIRouter(prefix="/items", tags=["items"])
 
-# Base directories
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-BASE_IMAGE_PATH = os.path.join(BASE_DIR, "static", "base_image.jpg")
-PDF_DIR = os.path.join(BASE_DIR, "generated_pdfs")
-os.makedirs(PDF_DIR, exist_ok=True)
+item_list_adapter = TypeAdapter(list[schemas.ItemRead])
+
+
+async def store_pdf(key: str, width: float, height: float) -> None:
+    pdf_bytes = await run_render(render_variant, width, height, RenderVariant.pdf)
+    await get_storage().put(key, pdf_bytes, content_type="application/pdf")
 
 
 async def generate_pdf(item_id: int, width: float, height: float) -> str:
-    """Helper to crop image and generate PDF, returning relative path."""
+    """Helper to crop image and generate PDF, returning its storage key."""
     try:
-        with Image.open(BASE_IMAGE_PATH) as img:
-            crop_box = (0, 0, int(width), int(height))
-            cropped_img = img.crop(crop_box)
-            temp_path = os.path.join(PDF_DIR, f"temp_{item_id}.jpg")
-            cropped_img.save(temp_path)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_filename = f"item_{item_id}_{timestamp}.pdf"
-            pdf_path = os.path.join(PDF_DIR, pdf_filename)
-
-            c = canvas.Canvas(pdf_path)
-            c.drawImage(temp_path, 50, 400, width=width, height=height)
-            c.drawString(50, 380, f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            c.save()
-
-            os.remove(temp_path)
-            return f"app/generated_pdfs/{pdf_filename}"
+        key = pdf_key(item_id)
+        await store_pdf(key, width, height)
+        return key
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
 
 
+async def current_pdf_path(item_id: int) -> str | None:
+    async with database.async_session_maker() as session:
+        return await session.scalar(select(models.Item.pdf_path).where(models.Item.id == item_id))
+
+
+async def stream_stored(key: str, media_type: str, headers: dict | None = None) -> StreamingResponse:
+    """Stream a stored file, raising 404 if it is missing."""
+    stream = get_storage().stream(key)
+    try:
+        first_chunk = await anext(stream)
+    except (ObjectNotFound, StopAsyncIteration):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    async def body():
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
 # CREATE
 @router.post("/", response_model=schemas.ItemRead)
 async def create_item(item: schemas.ItemCreate, db: AsyncSession = Depends(database.get_db)):
     # Validate Material
-    result = await db.execute(select(models.Material).where(models.Material.id == item.material_id))
-    material = result.scalars().first()
-    if not material:
+    result = await db.execute(queries.select_material_id, {"id": item.material_id})
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Material not found")
 
     # Validate Product Type
-    result = await db.execute(select(models.ProductType).where(models.ProductType.id == item.product_type_id))
-    pt = result.scalars().first()
-    if not pt:
+    result = await db.execute(queries.select_product_type_id, {"id": item.product_type_id})
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Product type not found")
 
     # Create DB record
@@ -64,70 +84,260 @@ async def create_item(item: schemas.ItemCreate, db: AsyncSession = Depends(datab
         pdf_path=None
     )
     db.add(db_item)
+    await db.flush()
+    # Recorded with the item so a render cut off by shutdown resumes on the next boot
+    render_job = models.RenderJob(item_id=db_item.id, pdf_key=pdf_key(db_item.id),
+                                  width=item.width, height=item.height)
+    db.add(render_job)
+    record_change(db, "item", db_item.id, "created")
     await db.commit()
-    await db.refresh(db_item)
+    event_hub.publish("created", db_item.id)
 
-    # Generate PDF
-    db_item.pdf_path = await generate_pdf(db_item.id, item.width, item.height)
+    # Generate PDF; the commit above returned the connection for the render
+    try:
+        await store_pdf(render_job.pdf_key, item.width, item.height)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
+    db_item.pdf_path = render_job.pdf_key
+    await db.delete(render_job)
+    record_change(db, "item", db_item.id, "updated")
     await db.commit()
     await db.refresh(db_item)
+    event_hub.publish("pdf-rendered", db_item.id, pdf_path=db_item.pdf_path)
 
     return db_item
 
 
+# BATCH LAYOUT: many items packed onto shared sheets in one PDF
+@router.post("/layout")
+async def layout_items(request: schemas.LayoutRequest, db: AsyncSession = Depends(database.get_db)):
+    item_ids = list(dict.fromkeys(request.item_ids))
+    result = await db.execute(
+        select(models.Item.id, models.Item.width, models.Item.height).where(models.Item.id.in_(item_ids))
+    )
+    dims = {row.id: (row.width, row.height) for row in result}
+    await database.release(db)
+    missing = [item_id for item_id in item_ids if item_id not in dims]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Items not found: {missing}")
+
+    widths, heights = layout_crops(*zip(*(dims[item_id] for item_id in item_ids)))
+    try:
+        sheet = pack(widths, heights, request.sheet_width, request.sheet_height, request.margin, request.gap)
+    except ValueError:
+        too_big = [item_id for item_id, w, h in zip(item_ids, widths, heights)
+                   if w > request.sheet_width - 2 * request.margin or h > request.sheet_height - 2 * request.margin]
+        raise HTTPException(status_code=422, detail=f"Items larger than the sheet: {too_big}")
+
+    try:
+        pdf_bytes = await run_render(render_layout_pdf, sheet)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
+    return Response(content=pdf_bytes, media_type="application/pdf", headers={
+        "Content-Disposition": 'inline; filename="layout.pdf"',
+        "X-Layout-Pages": str(sheet.pages),
+    })
+
+
+# EVENTS: server-sent item lifecycle events (created, updated, pdf-rendered, deleted)
+@router.get("/events")
+async def item_events(item_id: int | None = None):
+    subscription = event_hub.subscribe(item_id)
+
+    async def stream():
+        try:
+            yield f"retry: {int(settings.SSE_HEARTBEAT_SECONDS * 1000)}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event_hub.is_closed(message):
+                    if subscription.evicted:
+                        yield "event: evicted\ndata: {}\n\n"
+                    return
+                event_id, event, data = message
+                yield f"id: {event_id}\nevent: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
 # READ ALL
 @router.get("/", response_model=list[schemas.ItemRead])
-async def read_items(db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Item))
-    return result.scalars().all()
+async def read_items(material_id: int | None = None, product_type_id: int | None = None,
+                     db: AsyncSession = Depends(database.get_db)):
+    stmt = queries.select_items
+    if material_id is not None:
+        stmt = stmt.where(models.Item.material_id == material_id)
+    if product_type_id is not None:
+        stmt = stmt.where(models.Item.product_type_id == product_type_id)
+    result = await db.execute(stmt)
+    return rows_response(result.all(), queries.ITEM_FIELDS, item_list_adapter)
+
+
+# STATS (declared before /{item_id})
+@router.get("/stats")
+async def read_item_stats(db: AsyncSession = Depends(database.get_db)):
+    body = item_stats.get()
+    if body is None:
+        body = await item_stats.refresh(db)
+    return Response(content=body, media_type="application/json")
 
 
 # READ ONE
 @router.get("/{item_id}", response_model=schemas.ItemRead)
 async def read_item(item_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Item).where(models.Item.id == item_id))
-    item = result.scalars().first()
-    if not item:
+    result = await db.execute(queries.select_item_by_id, {"id": item_id})
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return row_response(row._mapping)
+
+
+# DOWNLOAD PDF
+@router.get("/{item_id}/pdf")
+async def download_item_pdf(item_id: int, db: AsyncSession = Depends(database.get_db)):
+    return await download_item_file(item_id, RenderVariant.pdf, db)
+
+
+# DOWNLOAD VARIANT (PDF, compressed PDF, thumbnails)
+@router.get("/{item_id}/files/{variant}")
+async def download_item_file(item_id: int, variant: RenderVariant, db: AsyncSession = Depends(database.get_db)):
+    result = await db.execute(queries.select_item_render_inputs, {"id": item_id})
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Item not found")
-    return item
+    # Rendering and streaming need no connection
+    await database.release(db)
+
+    spec = VARIANTS[variant]
+    if variant is RenderVariant.pdf:
+        if not row.pdf_path:
+            raise HTTPException(status_code=404, detail="PDF not found")
+        try:
+            # Serve the latest update's PDF rather than a 404 while its render is debounced
+            await render_scheduler.flush(item_id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
+        key = normalize_key(row.pdf_path)
+        return await stream_stored(key, spec.media_type, {"Content-Disposition": f'inline; filename="{key}"'})
+
+    # Other variants are rendered on first request and cached under a key
+    # derived from the render inputs, so cached copies never go stale.
+    key = variant_key(item_id, row.width, row.height, variant)
+    storage = get_storage()
+    if not await storage.exists(key):
+        async def produce():
+            if not await storage.exists(key):
+                data = await run_render(render_variant, row.width, row.height, variant)
+                await storage.put(key, data, content_type=spec.media_type)
+        try:
+            await single_flight(key, produce)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
+
+    return await stream_stored(key, spec.media_type, {
+        "Content-Disposition": f'inline; filename="{key}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{key}"',
+    })
 
 
 # UPDATE
 @router.put("/{item_id}", response_model=schemas.ItemRead)
-async def update_item(item_id: int, item: schemas.ItemCreate, db: AsyncSession = Depends(database.get_db)):
+async def update_item(item_id: int, item: schemas.ItemCreate, background_tasks: BackgroundTasks,
+                      db: AsyncSession = Depends(database.get_db)):
     result = await db.execute(select(models.Item).where(models.Item.id == item_id))
     db_item = result.scalars().first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
 
+    # Only width and height feed the render
+    render_changed = (db_item.width, db_item.height) != (item.width, item.height) or not db_item.pdf_path
+    old_variants = variant_keys(db_item.id, db_item.width, db_item.height)
+    old_pdf = db_item.pdf_path
+    if render_changed and settings.RENDER_DEBOUNCE_SECONDS <= 0:
+        # Render without holding a connection; the write below checks out a new one
+        await database.release(db)
+
     # Update fields
     db_item.material_id = item.material_id
     db_item.product_type_id = item.product_type_id
     db_item.width = item.width
     db_item.height = item.height
+    record_change(db, "item", item_id, "updated")
+
+    if not render_changed:
+        await db.commit()
+        await db.refresh(db_item)
+        event_hub.publish("updated", item_id)
+        return db_item
 
-    # Regenerate PDF
-    db_item.pdf_path = await generate_pdf(db_item.id, item.width, item.height)
+    if settings.RENDER_DEBOUNCE_SECONDS > 0:
+        # Point at the new key now and render once the item has been quiet for
+        # the debounce window; downloads in the meantime flush the render.
+        new_pdf = pdf_key(db_item.id)
+        db_item.pdf_path = new_pdf
+        render_job = models.RenderJob(item_id=item_id, pdf_key=new_pdf, width=item.width, height=item.height)
+        db.add(render_job)
+    else:
+        new_pdf = await generate_pdf(db_item.id, item.width, item.height)
+        db_item.pdf_path = new_pdf
 
     await db.commit()
     await db.refresh(db_item)
+    event_hub.publish("updated", item_id)
+
+    # Remove superseded files only once the new path is committed
+    keep = set(variant_keys(db_item.id, db_item.width, db_item.height)) | {db_item.pdf_path}
+    background_tasks.add_task(discard_files, [key for key in old_variants if key not in keep])
+    if settings.RENDER_DEBOUNCE_SECONDS > 0:
+        width, height = item.width, item.height
+
+        async def produce():
+            await store_pdf(new_pdf, width, height)
+
+        async def finish():
+            # Runs after the last coalesced render; never drop the key it just wrote
+            await complete_render_job(database.async_session_maker, render_job.id)
+            latest = await current_pdf_path(item_id)
+            if old_pdf and old_pdf != latest:
+                await discard_files([old_pdf])
+            if latest == new_pdf:
+                event_hub.publish("pdf-rendered", item_id, pdf_path=new_pdf)
+
+        render_scheduler.schedule(item_id, produce, finish)
+    else:
+        event_hub.publish("pdf-rendered", item_id, pdf_path=new_pdf)
+        if old_pdf and old_pdf not in keep:
+            background_tasks.add_task(discard_files, [old_pdf])
     return db_item
 
 
 # DELETE
 @router.delete("/{item_id}")
-async def delete_item(item_id: int, db: AsyncSession = Depends(database.get_db)):
+async def delete_item(item_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(database.get_db)):
     result = await db.execute(select(models.Item).where(models.Item.id == item_id))
     db_item = result.scalars().first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    # Delete PDF if exists
+    old_files = variant_keys(db_item.id, db_item.width, db_item.height)
     if db_item.pdf_path:
-        pdf_full_path = os.path.join(BASE_DIR, os.path.relpath(db_item.pdf_path, "app"))
-        if os.path.exists(pdf_full_path):
-            os.remove(pdf_full_path)
-
+        old_files.append(db_item.pdf_path)
     await db.delete(db_item)
+    await db.execute(delete(models.RenderJob).where(models.RenderJob.item_id == item_id))
+    record_change(db, "item", item_id, "deleted")
     await db.commit()
+    event_hub.publish("deleted", item_id)
+    render_scheduler.cancel(item_id)
+
+    # Delete PDF and cached variants after the commit and off the request path
+    background_tasks.add_task(discard_files, old_files)
     return {"detail": "Item deleted"}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import database, models
+from app.jobs import jobs
+from app.jobs.cascade import job_name
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+# READ job progress
+@router.get("/{job_id}")
+async def get_job(job_id: str, db: AsyncSession = Depends(database.get_db)):
+    # Cascade deletes are tracked in the database, so any worker can report them
+    cascade = await db.get(models.CascadeJob, job_id)
+    if cascade is not None:
+        return {
+            "id": cascade.id,
+            "name": job_name(cascade.entity, cascade.parent_id),
+            "status": cascade.status,
+            "total": cascade.total,
+            "processed": cascade.processed,
+            "error": cascade.error,
+        }
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
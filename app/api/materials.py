@@ -1,11 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
+from sqlalchemy import delete, exists
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
-from app.db import models, schemas, database
+from app.api.serialization import row_response, rows_response
+from app.config.config import settings
+from app.db import models, queries, schemas, database
+from app.db.changes import record_change
+from app.db.prefix_index import PrefixIndex, like_prefix
+from app.jobs.cascade import start_cascade_delete
 
 router = APIRouter(prefix="/materials", tags=["materials"])
 
+material_list_adapter = TypeAdapter(list[schemas.MaterialRead])
+
+name_index = PrefixIndex(queries.select_materials, settings.SEARCH_INDEX_REFRESH_SECONDS)
+
 
 # CREATE Material
 @router.post("/", response_model=schemas.MaterialRead)
@@ -13,29 +25,47 @@ async def create_material(material: schemas.MaterialCreate, db: AsyncSession = D
     db_material = models.Material(name=material.name, description=material.description)
     db.add(db_material)
     try:
+        await db.flush()
+        record_change(db, "material", db_material.id, "created")
         await db.commit()
         await db.refresh(db_material)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=400, detail="Material with this name already exists")
+    name_index.upsert((db_material.id, db_material.name, db_material.description))
     return db_material
 
 
 # READ all Materials
 @router.get("/", response_model=list[schemas.MaterialRead])
 async def get_materials(db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Material))
-    return result.scalars().all()
+    result = await db.execute(queries.select_materials)
+    return rows_response(result.all(), queries.MATERIAL_FIELDS, material_list_adapter)
+
+
+# SEARCH Materials by name prefix (declared before /{material_id})
+@router.get("/search", response_model=list[schemas.MaterialRead])
+async def search_materials(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(20, ge=1, le=100),
+                           db: AsyncSession = Depends(database.get_db)):
+    if settings.SEARCH_INDEX_ENABLED and await name_index.ensure_loaded(db):
+        rows = name_index.search(q, limit)
+    else:
+        result = await db.execute(
+            queries.select_materials.where(models.Material.name.like(like_prefix(q), escape="\\"))
+            .order_by(models.Material.name).limit(limit)
+        )
+        rows = result.all()
+    return rows_response(rows, queries.MATERIAL_FIELDS, material_list_adapter)
 
 
 # READ single Material by ID
 @router.get("/{material_id}", response_model=schemas.MaterialRead)
 async def get_material(material_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Material).where(models.Material.id == material_id))
-    material = result.scalars().first()
-    if not material:
+    result = await db.execute(queries.select_material_by_id, {"id": material_id})
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Material not found")
-    return material
+    return row_response(row._mapping)
 
 
 # UPDATE Material
@@ -49,6 +79,7 @@ async def update_material(material_id: int, material: schemas.MaterialCreate,
 
     db_material.name = material.name
     db_material.description = material.description
+    record_change(db, "material", material_id, "updated")
 
     try:
         await db.commit()
@@ -57,17 +88,35 @@ async def update_material(material_id: int, material: schemas.MaterialCreate,
         await db.rollback()
         raise HTTPException(status_code=400, detail="Material with this name already exists")
 
+    name_index.upsert((db_material.id, db_material.name, db_material.description))
     return db_material
 
 
 # DELETE Material
 @router.delete("/{material_id}")
-async def delete_material(material_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Material).where(models.Material.id == material_id))
-    db_material = result.scalars().first()
-    if not db_material:
+async def delete_material(material_id: int, cascade: bool = False, db: AsyncSession = Depends(database.get_db)):
+    if not await db.scalar(select(models.Material.id).where(models.Material.id == material_id)):
         raise HTTPException(status_code=404, detail="Material not found")
 
-    await db.delete(db_material)
-    await db.commit()
+    # Served by the (material_id, id) index, stops at the first referencing item
+    in_use = await db.scalar(select(exists().where(models.Item.material_id == material_id)))
+    if in_use:
+        if not cascade:
+            raise HTTPException(status_code=409, detail="Material is still used by items; pass cascade=true to delete them too")
+        job_id = await start_cascade_delete(db, database.async_session_maker, "material", material_id,
+                                            on_deleted=name_index.remove)
+        return JSONResponse(
+            status_code=202,
+            content={"detail": "Material deletion started", "job_id": job_id, "status_url": f"/jobs/{job_id}"},
+        )
+
+    try:
+        await db.execute(delete(models.Material).where(models.Material.id == material_id))
+        record_change(db, "material", material_id, "deleted")
+        await db.commit()
+    except IntegrityError:
+        # An item was added between the check and the delete
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Material is still used by items; pass cascade=true to delete them too")
+    name_index.remove(material_id)
     return {"detail": "Material deleted"}
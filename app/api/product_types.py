@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
+from sqlalchemy import delete, exists
 from sqlalchemy.future import select
-from app.db import models, schemas, database
+from sqlalchemy.exc import IntegrityError
+from app.api.serialization import row_response, rows_response
+from app.config.config import settings
+from app.db import models, queries, schemas, database
+from app.db.changes import record_change
+from app.db.prefix_index import PrefixIndex, like_prefix
+from app.jobs.cascade import start_cascade_delete
 
 router = APIRouter(prefix="/product-types", tags=["product-types"])
 
+product_type_list_adapter = TypeAdapter(list[schemas.ProductTypeRead])
+
+name_index = PrefixIndex(queries.select_product_types, settings.SEARCH_INDEX_REFRESH_SECONDS)
+
 # Create ProductType
 @router.post("/", response_model=schemas.ProductTypeRead)
 async def create_product_type(pt: schemas.ProductTypeCreate, db: AsyncSession = Depends(database.get_db)):
@@ -15,24 +28,41 @@ async def create_product_type(pt: schemas.ProductTypeCreate, db: AsyncSession =
 
     db_pt = models.ProductType(name=pt.name, description=pt.description)
     db.add(db_pt)
+    await db.flush()
+    record_change(db, "product_type", db_pt.id, "created")
     await db.commit()
     await db.refresh(db_pt)
+    name_index.upsert((db_pt.id, db_pt.name, db_pt.description))
     return db_pt
 
 # Read all ProductTypes
 @router.get("/", response_model=list[schemas.ProductTypeRead])
 async def read_product_types(db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.ProductType))
-    return result.scalars().all()
+    result = await db.execute(queries.select_product_types)
+    return rows_response(result.all(), queries.PRODUCT_TYPE_FIELDS, product_type_list_adapter)
+
+# Search ProductTypes by name prefix (declared before /{pt_id})
+@router.get("/search", response_model=list[schemas.ProductTypeRead])
+async def search_product_types(q: str = Query(..., min_length=1, max_length=100),
+                               limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(database.get_db)):
+    if settings.SEARCH_INDEX_ENABLED and await name_index.ensure_loaded(db):
+        rows = name_index.search(q, limit)
+    else:
+        result = await db.execute(
+            queries.select_product_types.where(models.ProductType.name.like(like_prefix(q), escape="\\"))
+            .order_by(models.ProductType.name).limit(limit)
+        )
+        rows = result.all()
+    return rows_response(rows, queries.PRODUCT_TYPE_FIELDS, product_type_list_adapter)
 
 # Read single ProductType
 @router.get("/{pt_id}", response_model=schemas.ProductTypeRead)
 async def read_product_type(pt_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.ProductType).where(models.ProductType.id == pt_id))
-    pt = result.scalars().first()
-    if not pt:
+    result = await db.execute(queries.select_product_type_by_id, {"id": pt_id})
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Product type not found")
-    return pt
+    return row_response(row._mapping)
 
 # Update ProductType
 @router.put("/{pt_id}", response_model=schemas.ProductTypeRead)
@@ -44,18 +74,37 @@ async def update_product_type(pt_id: int, pt: schemas.ProductTypeCreate, db: Asy
 
     db_pt.name = pt.name
     db_pt.description = pt.description
+    record_change(db, "product_type", pt_id, "updated")
     await db.commit()
     await db.refresh(db_pt)
+    name_index.upsert((db_pt.id, db_pt.name, db_pt.description))
     return db_pt
 
 # Delete ProductType
 @router.delete("/{pt_id}")
-async def delete_product_type(pt_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.ProductType).where(models.ProductType.id == pt_id))
-    db_pt = result.scalars().first()
-    if not db_pt:
+async def delete_product_type(pt_id: int, cascade: bool = False, db: AsyncSession = Depends(database.get_db)):
+    if not await db.scalar(select(models.ProductType.id).where(models.ProductType.id == pt_id)):
         raise HTTPException(status_code=404, detail="Product type not found")
 
-    await db.delete(db_pt)
-    await db.commit()
+    # Served by the (product_type_id, id) index, stops at the first referencing item
+    in_use = await db.scalar(select(exists().where(models.Item.product_type_id == pt_id)))
+    if in_use:
+        if not cascade:
+            raise HTTPException(status_code=409, detail="Product type is still used by items; pass cascade=true to delete them too")
+        job_id = await start_cascade_delete(db, database.async_session_maker, "product_type", pt_id,
+                                            on_deleted=name_index.remove)
+        return JSONResponse(
+            status_code=202,
+            content={"detail": "Product type deletion started", "job_id": job_id, "status_url": f"/jobs/{job_id}"},
+        )
+
+    try:
+        await db.execute(delete(models.ProductType).where(models.ProductType.id == pt_id))
+        record_change(db, "product_type", pt_id, "deleted")
+        await db.commit()
+    except IntegrityError:
+        # An item was added between the check and the delete
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Product type is still used by items; pass cascade=true to delete them too")
+    name_index.remove(pt_id)
     return {"detail": "Product type deleted"}
@@ -0,0 +1,28 @@
+from typing import Any, Mapping, Sequence
+
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.config.config import settings
+
+
+def rows_response(rows: Sequence[Sequence[Any]], fields: Sequence[str], adapter: TypeAdapter) -> Response:
+    """Encode column-projected rows straight to a JSON response.
+
+    Rows selected from our own tables are trusted by default and go straight
+    to orjson. With ``FAST_PATH_VALIDATE`` they are instead validated as one
+    batch by ``adapter`` and encoded by pydantic-core. Either way this skips
+    FastAPI's per-response ``response_model`` validation and ``jsonable_encoder`` pass.
+    """
+    records = [dict(zip(fields, row)) for row in rows]
+    if settings.FAST_PATH_VALIDATE:
+        body = adapter.dump_json(adapter.validate_python(records))
+    else:
+        body = orjson.dumps(records)
+    return Response(content=body, media_type="application/json")
+
+
+def row_response(row: Mapping[str, Any]) -> Response:
+    """Encode a single column-projected row (``Row._mapping``) as JSON."""
+    return Response(content=orjson.dumps(dict(row)), media_type="application/json")
@@ -18,9 +18,22 @@ class Settings(BaseSettings):
     DB_PORT: int = int(os.getenv("DB_PORT", 3306))
     DB_NAME: str = os.getenv("DB_NAME")
 
+    # "mysql" (production), "sqlite" (aiosqlite file at SQLITE_PATH) or "memory"
+    # (in-process SQLite, gone when the process exits; for tests and benchmarks)
+    DB_BACKEND: str = os.getenv("DB_BACKEND", "mysql").lower()
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "app.db")
+    # create_all on startup; the test suite creates the schema once per session instead
+    DB_CREATE_SCHEMA_ON_STARTUP: bool = os.getenv("DB_CREATE_SCHEMA_ON_STARTUP", "True").lower() == "true"
+
     # Automatically detect if running locally (not in Docker)
     @property
     def DATABASE_URL(self) -> str:
+        if self.DB_BACKEND == "sqlite":
+            return f"sqlite+aiosqlite:///{self.SQLITE_PATH}"
+        if self.DB_BACKEND == "memory":
+            return "sqlite+aiosqlite://"
+        if self.DB_BACKEND != "mysql":
+            raise ValueError(f"Unknown DB_BACKEND {self.DB_BACKEND!r}; expected mysql, sqlite or memory")
         host = self.DB_HOST
         # if DB_HOST is "db" but there's no Docker env var, assume local
         if host == "db" and not os.path.exists("/.dockerenv"):
@@ -30,8 +43,97 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+    # Per-worker cache of authenticated users; bounds how long another worker's logout takes to apply here
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 30))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
 
     STATIC_IMAGE_PATH: str = os.getenv("STATIC_IMAGE_PATH")
-    GENERATED_PDF_DIR: str = os.getenv("GENERATED_PDF_DIR")
+    GENERATED_PDF_DIR: str = os.getenv("GENERATED_PDF_DIR", "app/generated_pdfs")
+
+    # PDF storage: "local" (hash-sharded directory under GENERATED_PDF_DIR) or "s3"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_SHARD_DEPTH: int = int(os.getenv("STORAGE_SHARD_DEPTH", 2))
+    S3_BUCKET: str | None = os.getenv("S3_BUCKET")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL: str | None = os.getenv("S3_ENDPOINT_URL")
+    S3_REGION: str | None = os.getenv("S3_REGION")
+    S3_ACCESS_KEY_ID: str | None = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: str | None = os.getenv("S3_SECRET_ACCESS_KEY")
+
+    FILE_IO_THREADS: int = int(os.getenv("FILE_IO_THREADS", 8))
+
+    # Rendering
+    ITEM_MAX_WIDTH: float = float(os.getenv("ITEM_MAX_WIDTH", 10000))
+    ITEM_MAX_HEIGHT: float = float(os.getenv("ITEM_MAX_HEIGHT", 10000))
+    RENDER_THREADS: int = int(os.getenv("RENDER_THREADS", os.cpu_count() or 4))
+    THUMBNAIL_MAX_SIZE: int = int(os.getenv("THUMBNAIL_MAX_SIZE", 256))
+    COMPRESSED_PDF_JPEG_QUALITY: int = int(os.getenv("COMPRESSED_PDF_JPEG_QUALITY", 60))
+    # Most items one POST /items/layout request may place
+    LAYOUT_MAX_ITEMS: int = int(os.getenv("LAYOUT_MAX_ITEMS", 5000))
+    # Quiet window after an item update before its PDF is re-rendered; 0 renders inside the request
+    RENDER_DEBOUNCE_SECONDS: float = float(os.getenv("RENDER_DEBOUNCE_SECONDS", 0.5))
+
+    # Validate list rows with pydantic before encoding (off: rows from our own DB are trusted)
+    FAST_PATH_VALIDATE: bool = os.getenv("FAST_PATH_VALIDATE", "False").lower() == "true"
+
+    # GET /items/stats is recomputed at most this often; item writes show up once it expires
+    ITEM_STATS_TTL_SECONDS: float = float(os.getenv("ITEM_STATS_TTL_SECONDS", 30))
+
+    # GET /changes: longest long-poll, re-query interval for other workers' writes, and how old a
+    # change must be before it is served (so a slower transaction with a lower id is not skipped)
+    CHANGES_MAX_WAIT_SECONDS: float = float(os.getenv("CHANGES_MAX_WAIT_SECONDS", 30))
+    CHANGES_POLL_INTERVAL_SECONDS: float = float(os.getenv("CHANGES_POLL_INTERVAL_SECONDS", 1))
+    CHANGES_SETTLE_SECONDS: float = float(os.getenv("CHANGES_SETTLE_SECONDS", 2))
+    # Change log retention; pruning runs every CHANGE_LOG_PRUNE_INTERVAL_SECONDS (0 disables)
+    CHANGE_LOG_RETENTION_SECONDS: float = float(os.getenv("CHANGE_LOG_RETENTION_SECONDS", 7 * 24 * 3600))
+    CHANGE_LOG_PRUNE_INTERVAL_SECONDS: float = float(os.getenv("CHANGE_LOG_PRUNE_INTERVAL_SECONDS", 3600))
+
+    # GET /items/events: events buffered per subscriber before it is evicted, keep-alive interval
+    SSE_BUFFER_SIZE: int = int(os.getenv("SSE_BUFFER_SIZE", 100))
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+
+    # Name search on materials/product types: in-process prefix index, rebuilt to pick up other workers' writes
+    SEARCH_INDEX_ENABLED: bool = os.getenv("SEARCH_INDEX_ENABLED", "True").lower() == "true"
+    SEARCH_INDEX_REFRESH_SECONDS: float = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", 60))
+
+    # /readyz database ping: give up after the timeout, reuse the result for the cache window
+    READINESS_DB_TIMEOUT_SECONDS: float = float(os.getenv("READINESS_DB_TIMEOUT_SECONDS", 1))
+    READINESS_DB_CACHE_SECONDS: float = float(os.getenv("READINESS_DB_CACHE_SECONDS", 1))
+    # /debug/* expose pool internals and traffic stats unauthenticated; enable only in development
+    DEBUG_ENDPOINTS_ENABLED: bool = os.getenv("DEBUG_ENDPOINTS_ENABLED", "False").lower() == "true"
+
+    # Shutdown waits this long for in-flight requests, debounced renders and jobs
+    SHUTDOWN_DRAIN_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 25))
+
+    # Items removed per transaction when deleting a material/product type with ?cascade=true
+    CASCADE_DELETE_BATCH_SIZE: int = int(os.getenv("CASCADE_DELETE_BATCH_SIZE", 500))
+    # Finished cascade_jobs rows (and their /jobs/{id} status) are kept this long
+    CASCADE_JOB_RETENTION_SECONDS: float = float(os.getenv("CASCADE_JOB_RETENTION_SECONDS", 7 * 24 * 3600))
+
+    # Idempotency-Key support on POST /items and POST /materials
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 10000))
+
+    # Rate limiting (token bucket per user or client IP) and load shedding
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMIT_RATE: float = float(os.getenv("RATE_LIMIT_RATE", 10))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", 50))
+    RATE_LIMIT_RENDER_COST: float = float(os.getenv("RATE_LIMIT_RENDER_COST", 10))
+    RATE_LIMIT_AUTH_COST: float = float(os.getenv("RATE_LIMIT_AUTH_COST", 5))
+    RATE_LIMIT_REDIS_URL: str | None = os.getenv("RATE_LIMIT_REDIS_URL")
+    ADMISSION_MAX_RENDER_QUEUE: int = int(os.getenv("ADMISSION_MAX_RENDER_QUEUE", 32))
+    ADMISSION_MAX_POOL_WAIT_MS: float = float(os.getenv("ADMISSION_MAX_POOL_WAIT_MS", 500))
+
+    # Response compression (gzip; br/zstd when brotli/zstandard are installed)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+    # Orphaned PDF reconciliation (0 disables the background job)
+    STORAGE_GC_INTERVAL_SECONDS: int = int(os.getenv("STORAGE_GC_INTERVAL_SECONDS", 0))
+    STORAGE_GC_BATCH_SIZE: int = int(os.getenv("STORAGE_GC_BATCH_SIZE", 500))
+    STORAGE_GC_GRACE_SECONDS: int = int(os.getenv("STORAGE_GC_GRACE_SECONDS", 3600))
 
 settings = Settings()
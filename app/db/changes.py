@@ -0,0 +1,105 @@
+"""Change log writes, in-process wake-ups for long-polls, and retention."""
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+logger = logging.getLogger(__name__)
+
+COMPACTED = "compacted"
+
+
+def record_change(session: AsyncSession, entity: str, entity_id: int, op: str) -> None:
+    """Add a change row to the session's current transaction.
+
+    ``op`` is ``created``, ``updated`` or ``deleted``; the row commits or
+    rolls back together with the change itself.
+    """
+    session.add(models.ChangeLog(entity=entity, entity_id=entity_id, op=op))
+    session.info["changes_recorded"] = True
+
+
+async def record_changes(session: AsyncSession, entity: str, entity_ids: list[int], op: str) -> None:
+    """Bulk form of ``record_change`` for batch deletes."""
+    if entity_ids:
+        await session.execute(insert(models.ChangeLog), [
+            {"entity": entity, "entity_id": entity_id, "op": op} for entity_id in entity_ids
+        ])
+        session.info["changes_recorded"] = True
+
+
+class ChangeNotifier:
+    """Wakes long-polls in this process as soon as a change commits.
+
+    Long-polls also re-query on an interval to see changes committed by other
+    worker processes.
+    """
+
+    def __init__(self):
+        self._event: asyncio.Event | None = None
+
+    def notify(self) -> None:
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout: float) -> None:
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+change_notifier = ChangeNotifier()
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session: Session) -> None:
+    if session.info.pop("changes_recorded", False):
+        change_notifier.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("changes_recorded", None)
+
+
+async def prune_change_log(session_maker, retention_seconds: float) -> int:
+    """Delete changes older than the retention window; returns how many were removed.
+
+    The newest expired row is kept and turned into the ``compacted`` marker,
+    so any cursor below it is known to have missed changes.
+    """
+    async with session_maker() as session:
+        # created_at is stamped by the database, so the cutoff uses its clock too
+        db_now = await session.scalar(select(func.now()))
+        cutoff = db_now - timedelta(seconds=retention_seconds)
+        watermark = await session.scalar(
+            select(func.max(models.ChangeLog.id)).where(models.ChangeLog.created_at < cutoff)
+        )
+        if watermark is None:
+            return 0
+        result = await session.execute(delete(models.ChangeLog).where(models.ChangeLog.id < watermark))
+        await session.execute(
+            update(models.ChangeLog).where(models.ChangeLog.id == watermark).values(op=COMPACTED)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+async def run_periodic_prune(session_maker, interval_seconds: float, retention_seconds: float) -> None:
+    """Background loop started from the app lifespan; cancelled on shutdown."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            removed = await prune_change_log(session_maker, retention_seconds)
+            logger.info("Pruned %s change log entries", removed)
+        except Exception:
+            logger.exception("Change log pruning failed")
@@ -1,12 +1,41 @@
 from app.config.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from app.db.pool import TimedAsyncQueuePool
 
 # ✅ Create the base class for all models
 Base = declarative_base()
 
-# ✅ Create async engine using DATABASE_URL from .env
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+
+def create_engine_for(backend: str, url: str, **kwargs) -> AsyncEngine:
+    """Engine for one of the DB_BACKEND choices, with the SQLite differences smoothed over."""
+    if backend == "mysql":
+        return create_async_engine(url, poolclass=TimedAsyncQueuePool, **kwargs)
+
+    if backend == "memory":
+        # One shared connection: every new connection would open its own empty database
+        engine = create_async_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False}, **kwargs)
+    else:
+        engine = create_async_engine(url, poolclass=TimedAsyncQueuePool, connect_args={"timeout": 30}, **kwargs)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # MySQL enforces foreign keys (deletes of referenced rows fail); SQLite only when asked
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if backend == "sqlite":
+            # Readers do not block the writer, and writers wait for each other instead of failing
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+    return engine
+
+
+# ✅ Create async engine for the configured backend (DB_BACKEND in .env)
+engine = create_engine_for(settings.DB_BACKEND, settings.DATABASE_URL, echo=True, future=True)
 
 # ✅ Create session factory
 async_session_maker = sessionmaker(
@@ -17,5 +46,19 @@ async_session_maker = sessionmaker(
 
 # ✅ Dependency for FastAPI routes
 async def get_db():
+    """One session per request. It checks out a pooled connection only at its
+    first statement and returns it whenever its transaction ends (see release)."""
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def release(session: AsyncSession) -> None:
+    """End the session's transaction so its connection goes back to the pool.
+
+    Call before slow non-DB work (rendering, password hashing, streaming); the
+    next statement checks out a connection again. Loaded objects stay usable
+    because the session does not expire them on commit. Any pending changes
+    are committed, so release before modifying objects.
+    """
+    if session.in_transaction():
+        await session.commit()
\ No newline at end of file
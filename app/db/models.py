@@ -1,10 +1,10 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Float, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
 class User(Base):
     __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
 
@@ -12,19 +12,19 @@ class User(Base):
 
 class Material(Base):
     __tablename__ = "materials"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False)
     description = Column(String(255), nullable=True)
 
 class ProductType(Base):
     __tablename__ = "product_types"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False)
     description = Column(String(255), nullable=True)
 
 class Item(Base):
     __tablename__ = "items"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     material_id = Column(Integer, ForeignKey("materials.id"))
     product_type_id = Column(Integer, ForeignKey("product_types.id"))
     width = Column(Float, nullable=False)
@@ -34,11 +34,61 @@ class Item(Base):
     material = relationship("Material")
     product_type = relationship("ProductType")
 
+    # "Items of a material / product type ordered by id" and the reference
+    # checks on delete; the leading columns also back the foreign keys.
+    # pdf_path is looked up by the storage reconciliation job.
+    __table_args__ = (
+        Index("ix_items_material_id_id", "material_id", "id"),
+        Index("ix_items_product_type_id_id", "product_type_id", "id"),
+        Index("ix_items_pdf_path", "pdf_path"),
+    )
+
 class TokenSession(Base):
     __tablename__ = "token_sessions"
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     token = Column(String(255), unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="tokens")
+
+class RenderJob(Base):
+    """A PDF render that was promised (items.pdf_path points, or will point, at
+    pdf_key) but not yet confirmed written. Inserted in the same transaction as
+    the item change and removed once the file is stored; rows left behind by a
+    shutdown or crash are resumed on the next boot."""
+    __tablename__ = "render_jobs"
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False, index=True)
+    pdf_key = Column(String(255), nullable=False)
+    width = Column(Float, nullable=False)
+    height = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class CascadeJob(Base):
+    """A cascade delete of a material or product type and its items. Inserted
+    by the DELETE request and advanced batch by batch in the same transactions
+    as the deletes; unfinished rows are resumed on the next boot. ``owner``
+    names the run currently working on it, so only one worker advances it."""
+    __tablename__ = "cascade_jobs"
+    id = Column(String(32), primary_key=True)
+    entity = Column(String(32), nullable=False)
+    parent_id = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending | running | completed | failed
+    owner = Column(String(32), nullable=True)
+    total = Column(Integer, nullable=True)
+    processed = Column(Integer, nullable=False, default=0)
+    error = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+class ChangeLog(Base):
+    """Append-only feed of entity changes, written in the same transaction as
+    the change. ``id`` is the sync cursor. Pruning leaves the newest pruned row
+    as a ``compacted`` marker so readers can tell a cursor fell behind it."""
+    __tablename__ = "change_log"
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(16), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
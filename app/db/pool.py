@@ -0,0 +1,72 @@
+import math
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Connection checkout wait statistics, shared by every pool in the process."""
+
+    def __init__(self, smoothing: float = 0.2, decay_seconds: float = 5.0):
+        self.smoothing = smoothing
+        self.decay_seconds = decay_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_wait = 0.0  # exponentially weighted moving average
+        self.last_recorded = time.monotonic()
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.recent_wait = self._decayed() + self.smoothing * (seconds - self._decayed())
+            self.last_recorded = time.monotonic()
+
+    def _decayed(self) -> float:
+        # Fade the average while no checkouts happen, otherwise a load shedder
+        # that stops all traffic would never see the wait come back down
+        idle = time.monotonic() - self.last_recorded
+        return self.recent_wait * math.exp(-idle / self.decay_seconds)
+
+    def recent_wait_seconds(self) -> float:
+        with self._lock:
+            return self._decayed()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "recent_wait_ms": round(self._decayed() * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection
@@ -0,0 +1,92 @@
+"""In-process prefix index over the names of a small reference table.
+
+Entries are kept in a list sorted by case-folded name, so a prefix lookup is
+two bisects and a slice. Routers update the index after each committed write.
+Writes made by other worker processes only show up at the next rebuild, which
+happens at most ``refresh_seconds`` after the previous one.
+"""
+import bisect
+import time
+from typing import Sequence
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class PrefixIndex:
+    def __init__(self, load_statement: Select, refresh_seconds: float):
+        self.load_statement = load_statement
+        self.refresh_seconds = refresh_seconds
+        self._keys: list[tuple[str, int]] = []  # (folded name, id), sorted
+        self._rows: dict[int, tuple] = {}  # id -> row as selected by load_statement
+        self._loaded_at: float | None = None
+        self._loading = False
+        self._replay: list[tuple] = []
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    def invalidate(self) -> None:
+        """Drop the index; the next search rebuilds it from the database."""
+        self._keys, self._rows, self._loaded_at = [], {}, None
+
+    async def ensure_loaded(self, session: AsyncSession) -> bool:
+        """Build the index if it is missing or stale; False if there is none yet and another build is running."""
+        if self.ready:
+            return True
+        if self._loading:
+            return self._loaded_at is not None
+        self._loading = True
+        try:
+            rows = (await session.execute(self.load_statement)).all()
+        finally:
+            self._loading = False
+            replay, self._replay = self._replay, []
+        self._build(rows)
+        # Apply writes that committed while the rows were being read
+        for op, *args in replay:
+            getattr(self, op)(*args)
+        return True
+
+    def _build(self, rows: Sequence) -> None:
+        self._rows = {row[0]: tuple(row) for row in rows}
+        self._keys = sorted((row[1].casefold(), row[0]) for row in self._rows.values())
+        self._loaded_at = time.monotonic()
+
+    def upsert(self, row: tuple) -> None:
+        """Add or replace a row; ``row`` has the load statement's columns, id and name first."""
+        if self._loading:
+            self._replay.append(("upsert", tuple(row)))
+        self._discard(row[0])
+        self._rows[row[0]] = tuple(row)
+        bisect.insort(self._keys, (row[1].casefold(), row[0]))
+
+    def remove(self, row_id: int) -> None:
+        if self._loading:
+            self._replay.append(("remove", row_id))
+        self._discard(row_id)
+
+    def _discard(self, row_id: int) -> None:
+        old = self._rows.pop(row_id, None)
+        if old is not None:
+            key = (old[1].casefold(), row_id)
+            position = bisect.bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def search(self, prefix: str, limit: int) -> list[tuple]:
+        folded = prefix.casefold()
+        start = bisect.bisect_left(self._keys, (folded,))
+        matches = []
+        for name, row_id in self._keys[start:start + limit]:
+            if not name.startswith(folded):
+                break
+            matches.append(self._rows[row_id])
+        return matches
+
+
+def like_prefix(prefix: str) -> str:
+    """``LIKE`` pattern matching names that start with ``prefix`` literally."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
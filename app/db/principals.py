@@ -0,0 +1,93 @@
+"""Per-worker cache of authenticated user principals.
+
+A principal is the user's id and name plus the tokens that are currently
+logged in. Authorizing a request is a JWT check and a dictionary lookup; the
+database is read only on a miss, when an entry expired, or when the request
+carries a token the entry does not know yet (a login on another worker).
+
+Logout and password changes invalidate the entry in the worker that handled
+them. A login needs no invalidation: its new token misses the cached set and
+reloads the entry. Other workers drop theirs within ``ttl_seconds``, so a token
+revoked elsewhere stays usable there for at most that long.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import settings
+from app.db import models
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    tokens: frozenset[str]
+
+
+class PrincipalCache:
+    """LRU of user id -> Principal with a TTL, bounded to ``max_entries``."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._generations: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Principal | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return principal
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+
+    async def load(self, db: AsyncSession, user_id: int) -> Principal | None:
+        generation = self._generations.get(user_id, 0)
+        user = (await db.execute(
+            select(models.User.id, models.User.username).where(models.User.id == user_id)
+        )).first()
+        if user is None:
+            return None
+        tokens = (await db.execute(
+            select(models.TokenSession.token).where(models.TokenSession.user_id == user_id)
+        )).scalars().all()
+        principal = Principal(user.id, user.username, frozenset(tokens))
+        # A logout or password change that committed during the load already made these rows stale
+        if generation == self._generations.get(user_id, 0):
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return principal
+
+    async def authorize(self, db: AsyncSession, user_id: int, token: str) -> Principal | None:
+        """The user's principal if ``token`` is one of their live sessions, else None."""
+        principal = self.get(user_id)
+        if principal is not None and token in principal.tokens:
+            self.hits += 1
+            return principal
+        self.misses += 1
+        principal = await self.load(db, user_id)
+        if principal is None or token not in principal.tokens:
+            return None
+        return principal
+
+
+principals = PrincipalCache(settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.PRINCIPAL_CACHE_MAX_ENTRIES)
@@ -0,0 +1,33 @@
+"""Column-projected statements for the read paths.
+
+Selecting columns returns plain row tuples, so no ORM instances are built or
+tracked in the identity map. The statements are built once at import time:
+SQLAlchemy memoizes each statement's cache key, so executing them reuses the
+compiled SQL without rebuilding the construct per request.
+"""
+from sqlalchemy import bindparam, select
+
+from app.db import models
+
+ITEM_FIELDS = ("id", "material_id", "product_type_id", "width", "height", "pdf_path")
+ITEM_COLUMNS = tuple(getattr(models.Item, field) for field in ITEM_FIELDS)
+
+MATERIAL_FIELDS = ("id", "name", "description")
+MATERIAL_COLUMNS = tuple(getattr(models.Material, field) for field in MATERIAL_FIELDS)
+
+PRODUCT_TYPE_FIELDS = ("id", "name", "description")
+PRODUCT_TYPE_COLUMNS = tuple(getattr(models.ProductType, field) for field in PRODUCT_TYPE_FIELDS)
+
+select_items = select(*ITEM_COLUMNS).order_by(models.Item.id)
+select_item_by_id = select(*ITEM_COLUMNS).where(models.Item.id == bindparam("id"))
+select_item_render_inputs = select(models.Item.width, models.Item.height, models.Item.pdf_path).where(
+    models.Item.id == bindparam("id")
+)
+
+select_materials = select(*MATERIAL_COLUMNS)
+select_material_by_id = select(*MATERIAL_COLUMNS).where(models.Material.id == bindparam("id"))
+select_material_id = select(models.Material.id).where(models.Material.id == bindparam("id"))
+
+select_product_types = select(*PRODUCT_TYPE_COLUMNS)
+select_product_type_by_id = select(*PRODUCT_TYPE_COLUMNS).where(models.ProductType.id == bindparam("id"))
+select_product_type_id = select(models.ProductType.id).where(models.ProductType.id == bindparam("id"))
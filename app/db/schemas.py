@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict, constr
+from pydantic import BaseModel, ConfigDict, confloat, conlist, constr
 from typing import Optional
+from app.config.config import settings
 
 
 # Users
@@ -17,6 +18,10 @@ class UserCreate(BaseModel):
     username: str
     password: str
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
 class UserRead(BaseModel):
     id: int
     username: str
@@ -51,8 +56,9 @@ class ProductTypeRead(BaseModel):
 class ItemCreate(BaseModel):
     material_id: int
     product_type_id: int
-    width: float
-    height: float
+    # Bounded so a single request cannot force a huge render
+    width: confloat(gt=0, le=settings.ITEM_MAX_WIDTH, allow_inf_nan=False)
+    height: confloat(gt=0, le=settings.ITEM_MAX_HEIGHT, allow_inf_nan=False)
 
 class ItemRead(BaseModel):
     id: int
@@ -63,3 +69,11 @@ class ItemRead(BaseModel):
     pdf_path: str | None
 
     model_config = ConfigDict(from_attributes=True)
+
+# Batch layout (sizes in PDF points; defaults to an A3 sheet)
+class LayoutRequest(BaseModel):
+    item_ids: conlist(int, min_length=1, max_length=settings.LAYOUT_MAX_ITEMS)
+    sheet_width: confloat(gt=0, le=14400) = 842
+    sheet_height: confloat(gt=0, le=14400) = 1191
+    margin: confloat(ge=0) = 20
+    gap: confloat(ge=0) = 5
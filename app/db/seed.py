@@ -0,0 +1,258 @@
+"""Bulk-load synthetic data for scale testing.
+
+    python -m app.db.seed --items 1000000
+    python -m app.db.seed --items 20000 --render parallel --url sqlite+aiosqlite:///bench.db
+
+Rows go in through multi-row INSERTs in chunks, bypassing the ORM unit of
+work. PDFs are not rendered unless ``--render parallel`` is given, in which
+case they are rendered in worker processes and stored through the configured
+storage backend. Seeded users all have the password "password" and their
+sessions hold real access tokens.
+"""
+import argparse
+import asyncio
+import random
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.config import utils
+from app.config.config import settings
+from app.db import models
+from app.db.database import Base
+from app.render.renderer import RenderVariant, pdf_key, render_variant
+from app.storage import get_storage
+
+MATERIAL_NAMES = ["Steel", "Aluminum", "Copper", "Brass", "Oak", "Birch", "Acrylic", "Glass", "Vinyl", "Canvas"]
+PRODUCT_TYPE_NAMES = ["Panel", "Sign", "Poster", "Banner", "Label", "Sticker", "Frame", "Tile", "Board", "Card"]
+
+# Common print formats in points (width, height) used for about half the items
+STANDARD_SIZES = [(595, 842), (420, 595), (842, 1191), (612, 792), (288, 432), (360, 504)]
+
+
+@dataclass
+class SeedConfig:
+    materials: int = 50
+    product_types: int = 20
+    items: int = 100_000
+    users: int = 1_000
+    tokens_per_user: int = 3
+    chunk_size: int = 5_000
+    render: str = "none"
+    render_workers: int | None = None
+    render_batch: int = 64
+    seed: int = 42
+
+
+def item_dimensions(rng: random.Random) -> tuple[float, float]:
+    """Mix of standard formats and long-tailed custom sizes, within the accepted bounds."""
+    if rng.random() < 0.5:
+        width, height = rng.choice(STANDARD_SIZES)
+        if rng.random() < 0.5:
+            width, height = height, width
+        return float(width), float(height)
+    width = rng.lognormvariate(5.8, 0.6)
+    height = width * rng.lognormvariate(0, 0.35)
+    return (
+        round(min(max(width, 10.0), settings.ITEM_MAX_WIDTH), 2),
+        round(min(max(height, 10.0), settings.ITEM_MAX_HEIGHT), 2),
+    )
+
+
+def chunked(total: int, size: int):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+async def _next_id(conn, model) -> int:
+    return (await conn.execute(select(func.coalesce(func.max(model.id), 0)))).scalar() + 1
+
+
+async def seed_reference_data(conn, config: SeedConfig, run_tag: str) -> tuple[list[int], list[int]]:
+    first_material = await _next_id(conn, models.Material)
+    await conn.execute(insert(models.Material), [
+        {"name": f"{MATERIAL_NAMES[i % len(MATERIAL_NAMES)]} {run_tag}-{i}", "description": "Seeded material"}
+        for i in range(config.materials)
+    ])
+    first_type = await _next_id(conn, models.ProductType)
+    await conn.execute(insert(models.ProductType), [
+        {"name": f"{PRODUCT_TYPE_NAMES[i % len(PRODUCT_TYPE_NAMES)]} {run_tag}-{i}", "description": "Seeded type"}
+        for i in range(config.product_types)
+    ])
+    material_ids = (await conn.execute(
+        select(models.Material.id).where(models.Material.id >= first_material))).scalars().all()
+    type_ids = (await conn.execute(
+        select(models.ProductType.id).where(models.ProductType.id >= first_type))).scalars().all()
+    return list(material_ids), list(type_ids)
+
+
+async def seed_items(engine: AsyncEngine, config: SeedConfig, rng: random.Random,
+                     material_ids: list[int], type_ids: list[int]) -> None:
+    # Skewed popularity: a few materials/types account for most items
+    material_weights = [1 / (rank + 1) for rank in range(len(material_ids))]
+    type_weights = [1 / (rank + 1) for rank in range(len(type_ids))]
+    for start, end in chunked(config.items, config.chunk_size):
+        count = end - start
+        materials = rng.choices(material_ids, material_weights, k=count)
+        types = rng.choices(type_ids, type_weights, k=count)
+        rows = []
+        for material_id, type_id in zip(materials, types):
+            width, height = item_dimensions(rng)
+            rows.append({
+                "material_id": material_id,
+                "product_type_id": type_id,
+                "width": width,
+                "height": height,
+                "pdf_path": None,
+            })
+        # One transaction per chunk keeps lock and undo-log sizes bounded
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.Item), rows)
+
+
+async def seed_users(engine: AsyncEngine, config: SeedConfig, run_tag: str) -> None:
+    # bcrypt is deliberately slow, so every seeded user shares one hash (password "password")
+    hashed_password = utils.hash_password("password")
+    for start, end in chunked(config.users, config.chunk_size):
+        async with engine.begin() as conn:
+            first_user = await _next_id(conn, models.User)
+            await conn.execute(insert(models.User), [
+                {"username": f"user_{run_tag}_{i}", "hashed_password": hashed_password} for i in range(start, end)
+            ])
+            user_ids = (await conn.execute(
+                select(models.User.id).where(models.User.id >= first_user))).scalars().all()
+            # Real access tokens, so seeded sessions can authenticate requests;
+            # jti keeps tokens of the same user unique within one second
+            tokens = [
+                {"user_id": user_id,
+                 "token": utils.create_access_token({"sub": str(user_id), "jti": secrets.token_hex(8)})}
+                for user_id in user_ids for _ in range(config.tokens_per_user)
+            ]
+            if tokens:
+                await conn.execute(insert(models.TokenSession), tokens)
+
+
+async def prerender_pdfs(engine: AsyncEngine, config: SeedConfig, first_item_id: int) -> None:
+    """Render PDFs for the seeded items in worker processes and store them.
+
+    At most ``render_batch`` renders are in flight; each PDF is stored as
+    soon as it finishes and ``pdf_path`` updates are flushed in groups of
+    ``render_batch``, so memory stays bounded by the batch, not the chunk.
+    """
+    storage = get_storage()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(config.render_batch)
+    updates = []
+
+    async def flush():
+        if not updates:
+            return
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(models.Item.__table__)
+                .where(models.Item.__table__.c.id == bindparam("item_id"))
+                .values(pdf_path=bindparam("pdf_path")),
+                updates,
+            )
+        updates.clear()
+
+    async def render_one(pool, row):
+        async with slots:
+            pdf = await loop.run_in_executor(pool, render_variant, row.width, row.height, RenderVariant.pdf)
+            key = pdf_key(row.id)
+            await storage.put(key, pdf, content_type="application/pdf")
+        return row.id, key
+
+    with ProcessPoolExecutor(max_workers=config.render_workers) as pool:
+        last_id = first_item_id - 1
+        while True:
+            async with engine.connect() as conn:
+                rows = (await conn.execute(
+                    select(models.Item.id, models.Item.width, models.Item.height)
+                    .where(models.Item.id > last_id, models.Item.pdf_path.is_(None))
+                    .order_by(models.Item.id)
+                    .limit(config.chunk_size)
+                )).all()
+            if not rows:
+                break
+            for task in asyncio.as_completed([render_one(pool, row) for row in rows]):
+                item_id, key = await task
+                updates.append({"item_id": item_id, "pdf_path": key})
+                if len(updates) >= config.render_batch:
+                    await flush()
+            last_id = rows[-1].id
+    await flush()
+
+
+async def seed(engine: AsyncEngine, config: SeedConfig, reset: bool = False) -> None:
+    rng = random.Random(config.seed)
+    run_tag = secrets.token_hex(3)
+    async with engine.begin() as conn:
+        if reset:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        material_ids, type_ids = await seed_reference_data(conn, config, run_tag)
+        first_item_id = await _next_id(conn, models.Item)
+    await seed_items(engine, config, rng, material_ids, type_ids)
+    print(f"✅ {config.items} items in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    await seed_users(engine, config, run_tag)
+    print(f"✅ {config.users} users / {config.users * config.tokens_per_user} tokens "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    if config.render == "parallel":
+        started = time.perf_counter()
+        await prerender_pdfs(engine, config, first_item_id)
+        print(f"✅ PDFs rendered in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic data for scale testing")
+    parser.add_argument("--url", default=None, help="database URL (defaults to the app's DATABASE_URL)")
+    parser.add_argument("--materials", type=int, default=SeedConfig.materials)
+    parser.add_argument("--product-types", type=int, default=SeedConfig.product_types)
+    parser.add_argument("--items", type=int, default=SeedConfig.items)
+    parser.add_argument("--users", type=int, default=SeedConfig.users)
+    parser.add_argument("--tokens-per-user", type=int, default=SeedConfig.tokens_per_user)
+    parser.add_argument("--chunk-size", type=int, default=SeedConfig.chunk_size)
+    parser.add_argument("--render", choices=("none", "parallel"), default="none")
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--render-batch", type=int, default=SeedConfig.render_batch,
+                        help="maximum PDFs rendered or held in memory at once")
+    parser.add_argument("--seed", type=int, default=SeedConfig.seed)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    config = SeedConfig(
+        materials=args.materials,
+        product_types=args.product_types,
+        items=args.items,
+        users=args.users,
+        tokens_per_user=args.tokens_per_user,
+        chunk_size=args.chunk_size,
+        render=args.render,
+        render_workers=args.render_workers,
+        render_batch=args.render_batch,
+        seed=args.seed,
+    )
+
+    async def run():
+        engine = create_async_engine(args.url or settings.DATABASE_URL)
+        try:
+            await seed(engine, config, reset=args.reset)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Item aggregates for dashboards, from one grouped query cached for a short TTL.
+
+The query groups by (material_id, product_type_id); the per-material,
+per-product-type and overall figures are rolled up from those groups in
+Python, so the database scans the items table once per refresh instead of
+once per dashboard request. Writes are not tracked: they show up once the TTL
+expires, so the query runs at most once per TTL however busy the table is.
+Concurrent misses share one refresh.
+"""
+import time
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import settings
+from app.db import models
+from app.render.renderer import single_flight
+
+area = models.Item.width * models.Item.height
+
+select_item_stats = select(
+    models.Item.material_id,
+    models.Item.product_type_id,
+    func.count(),
+    func.sum(models.Item.width), func.min(models.Item.width), func.max(models.Item.width),
+    func.sum(models.Item.height), func.min(models.Item.height), func.max(models.Item.height),
+    func.sum(area), func.min(area), func.max(area),
+).group_by(models.Item.material_id, models.Item.product_type_id)
+
+MEASURES = ("width", "height", "area")
+
+
+class _Aggregate:
+    __slots__ = ("count", "sums", "mins", "maxs")
+
+    def __init__(self):
+        self.count = 0
+        self.sums = [0.0, 0.0, 0.0]
+        self.mins = [None, None, None]
+        self.maxs = [None, None, None]
+
+    def add(self, count: int, values: tuple) -> None:
+        self.count += count
+        for i in range(len(MEASURES)):
+            total, low, high = values[i * 3:i * 3 + 3]
+            self.sums[i] += total or 0.0
+            self.mins[i] = low if self.mins[i] is None else min(self.mins[i], low)
+            self.maxs[i] = high if self.maxs[i] is None else max(self.maxs[i], high)
+
+    def to_dict(self) -> dict:
+        result = {"count": self.count}
+        for i, measure in enumerate(MEASURES):
+            result[measure] = {
+                "sum": self.sums[i],
+                "min": self.mins[i],
+                "max": self.maxs[i],
+                "avg": self.sums[i] / self.count if self.count else None,
+            }
+        return result
+
+
+def summarize(rows) -> dict:
+    total = _Aggregate()
+    by_material: dict[int | None, _Aggregate] = {}
+    by_product_type: dict[int | None, _Aggregate] = {}
+    for material_id, product_type_id, count, *values in rows:
+        total.add(count, values)
+        by_material.setdefault(material_id, _Aggregate()).add(count, values)
+        by_product_type.setdefault(product_type_id, _Aggregate()).add(count, values)
+
+    def grouped(groups: dict, key: str) -> list[dict]:
+        # None (items without a reference) sorts first
+        return [{key: group_id, **agg.to_dict()}
+                for group_id, agg in sorted(groups.items(), key=lambda kv: (kv[0] is not None, kv[0] or 0))]
+
+    return {
+        "total": total.to_dict(),
+        "by_material": grouped(by_material, "material_id"),
+        "by_product_type": grouped(by_product_type, "product_type_id"),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class StatsCache:
+    """Encoded stats plus the monotonic time they were computed."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._body: bytes | None = None
+        self._computed_at = 0.0
+
+    def invalidate(self) -> None:
+        self._body = None
+
+    def get(self) -> bytes | None:
+        if self._body is not None and time.monotonic() - self._computed_at < self.ttl_seconds:
+            return self._body
+        return None
+
+    async def refresh(self, session: AsyncSession) -> bytes:
+        """Recompute the stats; callers that miss while a refresh runs wait for it."""
+        async def produce():
+            rows = (await session.execute(select_item_stats)).all()
+            self._body, self._computed_at = orjson.dumps(summarize(rows)), time.monotonic()
+
+        await single_flight("item_stats", produce)
+        return self._body
+
+
+item_stats = StatsCache(settings.ITEM_STATS_TTL_SECONDS)
@@ -0,0 +1,75 @@
+"""In-process pub/sub for item lifecycle events, streamed to clients over SSE.
+
+Each subscriber has a bounded queue. ``publish`` never waits: a subscriber
+whose queue is full is evicted (its stream ends with an ``evicted`` event and
+the client reconnects), so one slow client cannot hold up the request that
+published the event or grow memory without bound. Only events raised in this
+worker process are seen; the change feed (GET /changes) covers all workers.
+"""
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+
+from app.config.config import settings
+
+_CLOSED = object()
+
+
+@dataclass(eq=False)
+class Subscription:
+    queue: asyncio.Queue
+    item_id: int | None = None
+    evicted: bool = field(default=False)
+
+
+class EventHub:
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self._subscribers: set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self.evictions = 0
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, item_id: int | None = None) -> Subscription:
+        subscription = Subscription(asyncio.Queue(maxsize=self.buffer_size), item_id)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, item_id: int, **data) -> None:
+        message = (next(self._ids), event, {"item_id": item_id, **data})
+        for subscription in list(self._subscribers):
+            if subscription.item_id is not None and subscription.item_id != item_id:
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(subscription)
+
+    def _evict(self, subscription: Subscription) -> None:
+        self.evictions += 1
+        subscription.evicted = True
+        self._end(subscription)
+
+    def close(self) -> None:
+        """End every stream, e.g. when the process starts draining."""
+        for subscription in list(self._subscribers):
+            self._end(subscription)
+
+    def _end(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        # Undelivered events are dropped so the end marker always fits
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(_CLOSED)
+
+    @staticmethod
+    def is_closed(message) -> bool:
+        return message is _CLOSED
+
+
+event_hub = EventHub(settings.SSE_BUFFER_SIZE)
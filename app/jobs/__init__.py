@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    status: str = "pending"  # pending | running | completed | failed | cancelled
+    total: int | None = None
+    processed: int = 0
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """Runs background jobs as asyncio tasks in this worker and keeps their progress.
+
+    Only the most recent ``max_jobs`` finished jobs are remembered.
+    """
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def start(self, name: str, run: Callable[[Job], Awaitable[None]], job_id: str | None = None) -> Job:
+        job = Job(id=job_id or uuid.uuid4().hex, name=name)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, run))
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def running(self) -> list[Job]:
+        return [self._jobs[job_id] for job_id in self._tasks]
+
+    async def wait(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    def cancel_all(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[None]]) -> None:
+        job.status = "running"
+        try:
+            await run(job)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.name)
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.id, None)
+
+    def _trim(self) -> None:
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if job_id not in self._tasks:
+                del self._jobs[job_id]
+
+
+jobs = JobRegistry()
@@ -0,0 +1,154 @@
+import logging
+import uuid
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import settings
+from app.db import models
+from app.db.changes import record_change, record_changes
+from app.events import event_hub
+from app.jobs import Job, jobs
+from app.render.renderer import variant_keys
+from app.storage import discard_files
+
+logger = logging.getLogger(__name__)
+
+# Parent table and the item column referencing it, per cascade_jobs.entity
+CASCADE_TARGETS = {
+    "material": (models.Material, models.Item.material_id),
+    "product_type": (models.ProductType, models.Item.product_type_id),
+}
+
+UNFINISHED = ("pending", "running")
+
+
+def job_name(entity: str, parent_id: int) -> str:
+    return f"delete {entity} {parent_id}"
+
+
+async def start_cascade_delete(db: AsyncSession, session_maker, entity: str, parent_id: int,
+                               on_deleted: Callable[[int], None] | None = None) -> str:
+    """Record a cascade delete in cascade_jobs and start running it; returns the job id."""
+    job_id = uuid.uuid4().hex
+    db.add(models.CascadeJob(id=job_id, entity=entity, parent_id=parent_id, status="pending", processed=0))
+    await db.commit()
+    jobs.start(job_name(entity, parent_id),
+               lambda job: cascade_delete(job, session_maker, job_id, on_deleted), job_id=job_id)
+    return job_id
+
+
+async def resume_cascade_jobs(session_maker, on_deleted: dict[str, Callable[[int], None]] | None = None) -> None:
+    """Restart cascades a previous process left unfinished and forget old finished ones."""
+    on_deleted = on_deleted or {}
+    async with session_maker() as session:
+        db_now = await session.scalar(select(func.now()))
+        await session.execute(delete(models.CascadeJob).where(
+            models.CascadeJob.finished_at < db_now - timedelta(seconds=settings.CASCADE_JOB_RETENTION_SECONDS)
+        ))
+        pending = (await session.execute(
+            select(models.CascadeJob.id, models.CascadeJob.entity, models.CascadeJob.parent_id)
+            .where(models.CascadeJob.status.in_(UNFINISHED))
+            .order_by(models.CascadeJob.created_at)
+        )).all()
+        await session.commit()
+
+    for row in pending:
+        jobs.start(
+            job_name(row.entity, row.parent_id),
+            lambda job, row=row: cascade_delete(job, session_maker, row.id, on_deleted.get(row.entity)),
+            job_id=row.id,
+        )
+
+
+async def cascade_delete(job: Job, session_maker, cascade_id: str,
+                         on_deleted: Callable[[int], None] | None = None) -> None:
+    """Delete every item referencing the job's parent in batches, then the parent row.
+
+    Each batch is its own short transaction, so the items table is never
+    locked for the whole cascade. The batch also advances the job's progress
+    row, guarded by ``owner``: if another worker has taken the job over (it
+    resumed it on boot), this run rolls back and stops. PDFs and cached
+    variants of a batch are removed after its commit.
+    """
+    owner = uuid.uuid4().hex
+    batch_size = settings.CASCADE_DELETE_BATCH_SIZE
+    async with session_maker() as session:
+        cascade = await session.get(models.CascadeJob, cascade_id)
+        if cascade is None or cascade.status not in UNFINISHED:
+            return
+        parent_model, item_column = CASCADE_TARGETS[cascade.entity]
+        parent_id = cascade.parent_id
+        remaining = await session.scalar(select(func.count()).select_from(models.Item).where(item_column == parent_id))
+        claimed = await session.execute(
+            update(models.CascadeJob)
+            .where(models.CascadeJob.id == cascade_id, models.CascadeJob.owner == cascade.owner,
+                   models.CascadeJob.status.in_(UNFINISHED))
+            .values(owner=owner, status="running", total=cascade.processed + remaining)
+        )
+        if claimed.rowcount == 0:
+            await session.rollback()
+            return
+        await session.commit()
+        job.total, job.processed = cascade.processed + remaining, cascade.processed
+
+        async def advance(**values) -> bool:
+            # Locks the job row until commit; a worker that took the job over
+            # changed owner, so this run stops before deleting anything
+            result = await session.execute(
+                update(models.CascadeJob)
+                .where(models.CascadeJob.id == cascade_id, models.CascadeJob.owner == owner)
+                .values(**values)
+            )
+            if result.rowcount == 0:
+                logger.info("Cascade job %s was taken over by another worker", cascade_id)
+                await session.rollback()
+                return False
+            return True
+
+        try:
+            while True:
+                rows = (await session.execute(
+                    select(models.Item.id, models.Item.width, models.Item.height, models.Item.pdf_path)
+                    .where(item_column == parent_id)
+                    .order_by(models.Item.id)
+                    .limit(batch_size)
+                )).all()
+                if not rows:
+                    break
+                ids = [row.id for row in rows]
+                if not await advance(processed=models.CascadeJob.processed + len(ids)):
+                    return
+                await session.execute(delete(models.Item).where(models.Item.id.in_(ids)))
+                await session.execute(delete(models.RenderJob).where(models.RenderJob.item_id.in_(ids)))
+                await record_changes(session, "item", ids, "deleted")
+                await session.commit()
+                for item_id in ids:
+                    event_hub.publish("deleted", item_id)
+
+                files = []
+                for row in rows:
+                    files.extend(variant_keys(row.id, row.width, row.height))
+                    if row.pdf_path:
+                        files.append(row.pdf_path)
+                await discard_files(files)
+                job.processed += len(rows)
+
+            if not await advance(status="completed", finished_at=func.now()):
+                return
+            await session.execute(delete(parent_model).where(parent_model.id == parent_id))
+            record_change(session, cascade.entity, parent_id, "deleted")
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            await session.execute(
+                update(models.CascadeJob)
+                .where(models.CascadeJob.id == cascade_id, models.CascadeJob.owner == owner)
+                .values(status="failed", error=str(e)[:255], finished_at=func.now())
+            )
+            await session.commit()
+            raise
+    if on_deleted is not None:
+        on_deleted(parent_id)
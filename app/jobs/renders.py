@@ -0,0 +1,62 @@
+import logging
+
+from sqlalchemy import delete, select, update
+
+from app.db import models
+from app.db.changes import record_change
+from app.events import event_hub
+from app.jobs import Job
+from app.render.renderer import RenderVariant, render_variant, run_render
+from app.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+async def complete_render_job(session_maker, job_id: int) -> None:
+    async with session_maker() as session:
+        await session.execute(delete(models.RenderJob).where(models.RenderJob.id == job_id))
+        await session.commit()
+
+
+async def resume_render_jobs(job: Job, session_maker) -> None:
+    """Finish renders left in render_jobs by a previous process.
+
+    A job is still wanted while its item exists and points at the job's key
+    (or at nothing yet, for an interrupted create). Storage writes replace
+    whole objects, so rendering a key another replica is also finishing is
+    wasteful but harmless.
+    """
+    storage = get_storage()
+    async with session_maker() as session:
+        pending = (await session.execute(select(models.RenderJob).order_by(models.RenderJob.id))).scalars().all()
+        await session.commit()
+        job.total = len(pending)
+
+        for render_job in pending:
+            item = (await session.execute(
+                select(models.Item.pdf_path).where(models.Item.id == render_job.item_id)
+            )).first()
+            await session.commit()
+            rendered = False
+            if item is not None and item.pdf_path in (None, render_job.pdf_key):
+                try:
+                    if not await storage.exists(render_job.pdf_key):
+                        pdf_bytes = await run_render(render_variant, render_job.width, render_job.height,
+                                                     RenderVariant.pdf)
+                        await storage.put(render_job.pdf_key, pdf_bytes, content_type="application/pdf")
+                    if item.pdf_path is None:
+                        await session.execute(
+                            update(models.Item)
+                            .where(models.Item.id == render_job.item_id, models.Item.pdf_path.is_(None))
+                            .values(pdf_path=render_job.pdf_key)
+                        )
+                        record_change(session, "item", render_job.item_id, "updated")
+                    rendered = True
+                except Exception:
+                    # Deterministic inputs would fail the same way on every boot
+                    logger.exception("Dropping render job %s for item %s", render_job.id, render_job.item_id)
+            await session.execute(delete(models.RenderJob).where(models.RenderJob.id == render_job.id))
+            await session.commit()
+            if rendered:
+                event_hub.publish("pdf-rendered", render_job.item_id, pdf_path=render_job.pdf_key)
+            job.processed += 1
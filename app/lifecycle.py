@@ -0,0 +1,49 @@
+import asyncio
+
+
+class Lifecycle:
+    """Process state for readiness checks and graceful shutdown.
+
+    ``starting`` until the lifespan startup finishes, ``ready`` while serving,
+    ``draining`` once shutdown begins (new render work is refused while
+    in-flight requests finish) and ``stopped`` after the drain.
+    """
+
+    def __init__(self):
+        self.state = "starting"
+        self.inflight = 0
+
+    @property
+    def draining(self) -> bool:
+        return self.state in ("draining", "stopped")
+
+    def mark_starting(self) -> None:
+        self.state = "starting"
+
+    def mark_ready(self) -> None:
+        self.state = "ready"
+
+    def begin_drain(self) -> None:
+        self.state = "draining"
+
+    def mark_stopped(self) -> None:
+        self.state = "stopped"
+
+    def request_started(self) -> None:
+        self.inflight += 1
+
+    def request_finished(self) -> None:
+        self.inflight -= 1
+
+    async def wait_idle(self, timeout: float, poll_interval: float = 0.05) -> bool:
+        """Wait until no requests are in flight; False if ``timeout`` ran out first."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.inflight > 0:
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(poll_interval)
+        return True
+
+
+lifecycle = Lifecycle()
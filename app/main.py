@@ -1,28 +1,170 @@
+import asyncio
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
-from app.api import auth, materials, product_types, items 
+from contextlib import asynccontextmanager, suppress
+from app.api import auth, materials, product_types, items, jobs as jobs_api, health, changes
+from app.config.config import settings
 from app.db import database, models
+from app.db.changes import run_periodic_prune
+from app.db.pool import pool_stats
+from app.jobs import jobs
+from app.jobs.cascade import resume_cascade_jobs
+from app.jobs.renders import resume_render_jobs
+from app.events import event_hub
+from app.lifecycle import lifecycle
+from app.middleware.admission import AdmissionController, AdmissionMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.drain import InFlightMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware, RouteCost, build_backend
+from app.render import renderer
+from app.render.scheduler import render_scheduler
+from app.storage import fileio, get_storage
+from app.storage.reconcile import run_periodic_reconcile
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # ✅ Startup logic
+    lifecycle.mark_starting()
+    # Connect once before anything runs concurrently: a pool runs the connect
+    # hooks of its first connection under a thread lock, and a second checkout
+    # waiting on that lock would block the event loop
     async with database.engine.begin() as conn:
-        await conn.run_sync(models.Base.metadata.create_all)
-    print("✅ Database tables created")
+        if settings.DB_CREATE_SCHEMA_ON_STARTUP:
+            await conn.run_sync(models.Base.metadata.create_all)
+            print("✅ Database tables created")
 
+    # ✅ Decode the base image before reporting ready
+    await renderer.run_render(renderer.load_base_image)
+
+    # ✅ Continue cascade deletes a previous process left unfinished
+    await resume_cascade_jobs(database.async_session_maker, on_deleted={
+        "material": materials.name_index.remove,
+        "product_type": product_types.name_index.remove,
+    })
+
+    # ✅ Finish renders a previous process left behind
+    jobs.start("resume renders", lambda job: resume_render_jobs(job, database.async_session_maker))
+
+    gc_task = None
+    if settings.STORAGE_GC_INTERVAL_SECONDS > 0:
+        gc_task = asyncio.create_task(run_periodic_reconcile(
+            get_storage(),
+            database.async_session_maker,
+            settings.STORAGE_GC_INTERVAL_SECONDS,
+            batch_size=settings.STORAGE_GC_BATCH_SIZE,
+            grace_seconds=settings.STORAGE_GC_GRACE_SECONDS,
+            temp_max_age_seconds=settings.STORAGE_GC_GRACE_SECONDS,
+        ))
+
+    prune_task = None
+    if settings.CHANGE_LOG_PRUNE_INTERVAL_SECONDS > 0:
+        prune_task = asyncio.create_task(run_periodic_prune(
+            database.async_session_maker,
+            settings.CHANGE_LOG_PRUNE_INTERVAL_SECONDS,
+            settings.CHANGE_LOG_RETENTION_SECONDS,
+        ))
+
+    lifecycle.mark_ready()
     yield  # App runs here
 
-    # ✅ Shutdown logic
+    # ✅ Shutdown logic: refuse new renders, let in-flight work finish until the deadline
+    lifecycle.begin_drain()
+    event_hub.close()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SHUTDOWN_DRAIN_SECONDS
+    drained = await lifecycle.wait_idle(settings.SHUTDOWN_DRAIN_SECONDS)
+    try:
+        await asyncio.wait_for(render_scheduler.flush_all(), max(deadline - loop.time(), 0))
+        running = [jobs.wait(job.id) for job in jobs.running()]
+        if running:
+            await asyncio.wait_for(asyncio.gather(*running), max(deadline - loop.time(), 0))
+    except asyncio.TimeoutError:
+        drained = False
+    if drained:
+        print("✅ Drained in-flight requests and renders")
+    else:
+        # Unfinished renders and cascade deletes stay in their tables and resume on the next boot
+        render_scheduler.cancel_all()
+        jobs.cancel_all()
+        print(f"⚠️ Drain deadline hit ({lifecycle.inflight} requests in flight); unfinished renders and cascade deletes resume on next boot")
+
+    for task in (gc_task, prune_task):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
     await database.engine.dispose()
     print("🧹 Database engine disposed")
+    renderer.shutdown()
+    fileio.shutdown()
+    lifecycle.mark_stopped()
 
 
 # ✅ Create FastAPI app with lifespan
 app = FastAPI(lifespan=lifespan)
 
+# ✅ Replay retried creates instead of executing them again
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=("/items/", "/materials/"),
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+)
+
+# ✅ Admission control: shed load before expensive work starts
+RENDER_ROUTES = [
+    RouteCost(frozenset({"POST"}), r"/items/?", settings.RATE_LIMIT_RENDER_COST),
+    RouteCost(frozenset({"POST"}), r"/items/layout", settings.RATE_LIMIT_RENDER_COST),
+    RouteCost(frozenset({"PUT"}), r"/items/\d+", settings.RATE_LIMIT_RENDER_COST),
+    RouteCost(frozenset({"GET"}), r"/items/\d+/files/.+", settings.RATE_LIMIT_RENDER_COST / 2),
+]
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=AdmissionController(
+        render_queue_depth=renderer.render_queue_depth,
+        pool_wait_seconds=pool_stats.recent_wait_seconds,
+        max_render_queue=settings.ADMISSION_MAX_RENDER_QUEUE,
+        max_pool_wait_seconds=settings.ADMISSION_MAX_POOL_WAIT_MS / 1000,
+        draining=lambda: lifecycle.draining,
+    ),
+    render_routes=RENDER_ROUTES,
+    exempt_paths=health.PROBE_PATHS,
+)
+
+# ✅ Rate limiting, weighted by route cost
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=build_backend(settings.RATE_LIMIT_REDIS_URL),
+        rate=settings.RATE_LIMIT_RATE,
+        burst=settings.RATE_LIMIT_BURST,
+        costs=RENDER_ROUTES + [
+            RouteCost(frozenset({"POST"}), r"/auth/(login|register)", settings.RATE_LIMIT_AUTH_COST),
+        ],
+        exempt_paths=health.PROBE_PATHS,
+    )
+
+# ✅ Compress responses, including the errors the middlewares above send;
+# PDFs, images and file downloads are already compressed
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        exclude_paths=[r"/items/\d+/files/.+", r"/items/layout"],
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    )
+
+# ✅ Outermost, so shutdown can wait for every in-flight request
+app.add_middleware(InFlightMiddleware, lifecycle=lifecycle)
+
 # ✅ Include routers
 app.include_router(auth.router)
 app.include_router(materials.router)
 app.include_router(product_types.router)
 app.include_router(items.router)
+app.include_router(jobs_api.router)
+app.include_router(health.router)
+app.include_router(changes.router)
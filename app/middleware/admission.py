@@ -0,0 +1,57 @@
+from typing import Callable
+
+from app.middleware.rate_limit import RouteCost, send_error
+
+
+class AdmissionController:
+    """Decides whether the process has headroom for more work.
+
+    ``render_queue_depth``, ``pool_wait_seconds`` and ``draining`` are
+    callables so the controller reads live values from the render pool, the
+    DB pool stats and the process lifecycle.
+    """
+
+    def __init__(self, render_queue_depth: Callable[[], int], pool_wait_seconds: Callable[[], float],
+                 max_render_queue: int, max_pool_wait_seconds: float, retry_after_seconds: float = 1,
+                 draining: Callable[[], bool] = lambda: False):
+        self.draining = draining
+        self.render_queue_depth = render_queue_depth
+        self.pool_wait_seconds = pool_wait_seconds
+        self.max_render_queue = max_render_queue
+        self.max_pool_wait_seconds = max_pool_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+    def overload_reason(self, render_bound: bool) -> str | None:
+        if render_bound and self.draining():
+            return "Server is shutting down"
+        if render_bound and self.render_queue_depth() >= self.max_render_queue:
+            return "Render queue is full"
+        if self.pool_wait_seconds() >= self.max_pool_wait_seconds:
+            return "Database is saturated"
+        return None
+
+
+class AdmissionMiddleware:
+    """Shed load with 503 + Retry-After before work starts when the process is overloaded.
+
+    Render-bound routes are refused when the render queue is too deep; any
+    request is refused while DB connection waits exceed the threshold.
+    """
+
+    def __init__(self, app, controller: AdmissionController, render_routes: list[RouteCost] = (), exempt_paths=()):
+        self.app = app
+        self.controller = controller
+        self.render_routes = list(render_routes)
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        render_bound = any(rule.matches(scope["method"], scope["path"]) for rule in self.render_routes)
+        reason = self.controller.overload_reason(render_bound)
+        if reason:
+            await send_error(send, 503, reason, self.controller.retry_after_seconds)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,236 @@
+"""Response compression negotiated from Accept-Encoding.
+
+gzip is always available; br and zstd are offered when the ``brotli`` and
+``zstandard`` packages are installed. Complete bodies below ``minimum_size``
+are sent as-is. Streamed bodies are compressed chunk by chunk and flushed
+after every chunk, so clients see each part as soon as the app sends it.
+"""
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: br is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is only offered when installed
+    zstandard = None
+
+# Payloads that are already compressed gain nothing from another pass
+DEFAULT_SKIP_CONTENT_TYPES = (
+    "application/pdf", "image/", "video/", "audio/", "application/zip", "application/gzip",
+    "application/x-7z-compressed", "application/octet-stream",
+)
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def flush(self) -> bytes:
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def flush(self) -> bytes:
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def available_encodings() -> list[str]:
+    """Encodings this process can produce, most preferred first."""
+    return [name for name, module in (("br", brotli), ("zstd", zstandard), ("gzip", zlib)) if module is not None]
+
+
+def negotiate(accept_encoding: str, supported: list[str]) -> str | None:
+    """Pick the supported encoding with the highest q-value; ties go to the order of ``supported``."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in supported:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class CompressionStats:
+    """Bytes in and out per encoding, plus responses left uncompressed and why."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.encodings: dict[str, dict[str, int]] = {}
+        self.skipped: dict[str, int] = {}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int) -> None:
+        totals = self.encodings.setdefault(encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0})
+        totals["responses"] += 1
+        totals["bytes_in"] += bytes_in
+        totals["bytes_out"] += bytes_out
+
+    def record_skip(self, reason: str) -> None:
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def snapshot(self) -> dict:
+        return {
+            "encodings": {
+                name: {
+                    **totals,
+                    "ratio": round(totals["bytes_in"] / totals["bytes_out"], 3) if totals["bytes_out"] else None,
+                }
+                for name, totals in self.encodings.items()
+            },
+            "skipped": dict(self.skipped),
+        }
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """Compress responses for clients that accept it.
+
+    Responses are left alone when they are already encoded, partial, below
+    ``minimum_size``, of a ``skip_content_types`` type, or on a path matching
+    one of ``exclude_paths`` (full-match regexes, e.g. file downloads).
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, exclude_paths=(), skip_content_types=DEFAULT_SKIP_CONTENT_TYPES,
+                 gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3,
+                 stats: CompressionStats | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.exclude_paths = [re.compile(pattern) for pattern in exclude_paths]
+        self.skip_content_types = tuple(skip_content_types)
+        self.supported = available_encodings()
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        self.stats = stats or compression_stats
+
+    def _compressor(self, encoding: str):
+        level = self.levels[encoding]
+        return {"gzip": _Gzip, "br": _Brotli, "zstd": _Zstd}[encoding](level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or any(p.fullmatch(scope["path"]) for p in self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        accept = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept += b"," + value
+        encoding = negotiate(accept.decode("latin-1"), self.supported) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        bytes_in = bytes_out = 0
+
+        async def send_compressed(message):
+            nonlocal start, compressor, bytes_in, bytes_out
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start is not None:
+                reason = self._skip_reason(start, body, more_body)
+                headers = list(start["headers"])
+                if reason is None:
+                    compressor = self._compressor(encoding)
+                    headers = [(k, v) for k, v in headers if k != b"content-length"]
+                    headers.append((b"content-encoding", encoding.encode()))
+                elif reason != "encoded":
+                    self.stats.record_skip(reason)
+                if not any(k == b"vary" and b"accept-encoding" in v.lower() for k, v in headers):
+                    headers.append((b"vary", b"Accept-Encoding"))
+                start = {**start, "headers": headers}
+
+                if compressor is not None and not more_body:
+                    data = compressor.compress(body) + compressor.finish()
+                    start["headers"].append((b"content-length", str(len(data)).encode()))
+                    self.stats.record(encoding, len(body), len(data))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send(start)
+                start = None
+
+            if compressor is None:
+                await send(message)
+                return
+
+            bytes_in += len(body)
+            data = compressor.compress(body) + (compressor.flush() if more_body else compressor.finish())
+            bytes_out += len(data)
+            if not more_body:
+                self.stats.record(encoding, bytes_in, bytes_out)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _skip_reason(self, start: dict, body: bytes, more_body: bool) -> str | None:
+        headers = {k.lower(): v for k, v in start["headers"]}
+        if b"content-encoding" in headers:
+            return "encoded"
+        if start["status"] < 200 or start["status"] in (204, 206, 304) or b"content-range" in headers:
+            return "status"
+        content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+        if content_type.startswith(self.skip_content_types):
+            return "content_type"
+        length = len(body) if not more_body else int(headers.get(b"content-length", -1))
+        if 0 <= length < self.minimum_size:
+            return "too_small"
+        return None
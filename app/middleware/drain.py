@@ -0,0 +1,20 @@
+from app.lifecycle import Lifecycle
+
+
+class InFlightMiddleware:
+    """Count in-flight HTTP requests so shutdown can wait for them to finish."""
+
+    def __init__(self, app, lifecycle: Lifecycle):
+        self.app = app
+        self.lifecycle = lifecycle
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.lifecycle.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.lifecycle.request_finished()
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires_at: float
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    status: int | None = None
+    headers: list[tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+
+
+class IdempotencyStore:
+    """Bounded in-process cache of responses keyed by Idempotency-Key, with TTL."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def get(self, key: str) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def start(self, key: str, fingerprint: str) -> _Entry:
+        entry = _Entry(fingerprint=fingerprint, expires_at=time.monotonic() + self.ttl_seconds)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, key: str, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class IdempotencyMiddleware:
+    """Replay the first response for POSTs that repeat an ``Idempotency-Key``.
+
+    The key is scoped to the path and the caller's Authorization header, and
+    bound to a fingerprint of the request body: reusing it with a different
+    body is rejected with 422. A duplicate that arrives while the original is
+    still running waits for it instead of executing again. 5xx responses are
+    not stored so the client can retry them.
+    """
+
+    def __init__(self, app, paths, ttl_seconds: float = 86400, max_entries: int = 10000,
+                 store: IdempotencyStore | None = None):
+        self.app = app
+        self.paths = {path.rstrip("/") for path in paths}
+        self.store = store or IdempotencyStore(ttl_seconds, max_entries)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        caller = hashlib.sha256(headers.get(b"authorization", b"")).hexdigest()
+        key = f"{scope['path'].rstrip('/')}:{caller}:{idempotency_key.decode('latin-1')}"
+
+        while True:
+            entry = self.store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                await self._send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request"})
+                return
+            await entry.done.wait()
+            if entry.status is not None:
+                await self._replay(send, entry)
+                return
+            # The original failed and was discarded; this request takes over
+
+        entry = self.store.start(key, fingerprint)
+        await self._execute(scope, body, send, key, entry)
+
+    async def _execute(self, scope, body, send, key, entry):
+        status = None
+        response_headers = []
+        chunks = []
+
+        async def replay_receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture_send(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            self.store.discard(key, entry)
+            raise
+        else:
+            if status is not None and status < 500:
+                entry.status = status
+                entry.headers = response_headers
+                entry.body = b"".join(chunks)
+            else:
+                self.store.discard(key, entry)
+        finally:
+            entry.done.set()
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _replay(send, entry: _Entry):
+        await send({
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": entry.headers + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": entry.body})
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
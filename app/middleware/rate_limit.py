@@ -0,0 +1,153 @@
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Protocol
+
+from jose import JWTError, jwt
+
+from app.config.config import settings
+
+
+@dataclass(frozen=True)
+class RouteCost:
+    """Token cost charged for requests whose method and path match."""
+    methods: frozenset[str]
+    path_pattern: str
+    cost: float
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and re.fullmatch(self.path_pattern, path) is not None
+
+
+class TokenBucketBackend(Protocol):
+    async def take(self, key: str, cost: float, rate: float, capacity: float) -> float:
+        """Consume ``cost`` tokens. Returns 0 if allowed, else seconds until enough tokens refill."""
+
+
+class InMemoryTokenBucket:
+    """Per-process buckets. Also the local stand-in for the shared Redis backend."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, cost: float, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Refill and take atomically in Redis; returns the wait in milliseconds
+_REDIS_TAKE = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 't'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'u'))
+local cost, rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+if tokens == nil then tokens = capacity; updated = now end
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return math.ceil(wait * 1000)
+"""
+
+
+class RedisTokenBucket:
+    """Buckets shared by every worker through Redis (``redis.asyncio`` client)."""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, cost: float, rate: float, capacity: float) -> float:
+        wait_ms = await self.client.eval(_REDIS_TAKE, 1, self.prefix + key, cost, rate, capacity, time.time())
+        return int(wait_ms) / 1000
+
+
+def build_backend(redis_url: str | None) -> TokenBucketBackend:
+    """Shared Redis buckets when ``redis_url`` is set, per-process buckets otherwise."""
+    if not redis_url:
+        return InMemoryTokenBucket()
+    try:
+        import redis.asyncio as redis
+    except ImportError as e:
+        raise RuntimeError("redis is required when RATE_LIMIT_REDIS_URL is set") from e
+    return RedisTokenBucket(redis.from_url(redis_url))
+
+
+def client_identity(scope) -> str:
+    """Authenticated user id from a bearer JWT when present, else the client address."""
+    headers = dict(scope["headers"])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def send_error(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting per client, charging each route its cost weight.
+
+    Every client gets a bucket of ``burst`` tokens refilled at ``rate`` tokens
+    per second. Requests matching a ``RouteCost`` rule use its cost, all
+    others ``default_cost``. Exhausted buckets get 429 with Retry-After.
+    """
+
+    def __init__(self, app, backend: TokenBucketBackend, rate: float, burst: float,
+                 costs: list[RouteCost] = (), default_cost: float = 1.0, exempt_paths=()):
+        self.app = app
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.costs = list(costs)
+        self.default_cost = default_cost
+        self.exempt_paths = set(exempt_paths)
+
+    def cost_for(self, method: str, path: str) -> float:
+        for rule in self.costs:
+            if rule.matches(method, path):
+                return rule.cost
+        return self.default_cost
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        cost = self.cost_for(scope["method"], scope["path"])
+        wait = await self.backend.take(client_identity(scope), cost, self.rate, self.burst)
+        if wait > 0:
+            await send_error(send, 429, "Rate limit exceeded", wait)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,128 @@
+"""Batch layout: pack many item crops onto shared sheets and render one PDF.
+
+Packing is shelf-based (next-fit decreasing height). Items are sorted by
+height once; each shelf takes the longest run of the remaining items whose
+cumulative width fits the sheet, found with one ``cumsum`` + ``searchsorted``
+per shelf, and shelves are assigned to pages the same way. Python only loops
+per shelf and per page, never per item.
+
+The PDF embeds the base image once as a form XObject. Every crop draws that
+form clipped to the crop's rectangle, so a print run of thousands of items
+holds one copy of the image however many crops and pages it has.
+"""
+import io
+from dataclasses import dataclass
+
+import numpy as np
+from reportlab.pdfgen import canvas
+
+from app.render.renderer import BASE_IMAGE_PATH, crop_size, load_base_image
+
+BASE_FORM = "base_image"
+
+
+@dataclass
+class Layout:
+    sheet_width: float
+    sheet_height: float
+    # Per item, in the order the items were given
+    page: np.ndarray
+    x: np.ndarray  # left edge, PDF points from the page's left
+    y: np.ndarray  # bottom edge, PDF points from the page's bottom
+    width: np.ndarray
+    height: np.ndarray
+
+    @property
+    def pages(self) -> int:
+        return int(self.page.max()) + 1 if len(self.page) else 0
+
+
+def _runs(lengths: np.ndarray, capacity: float, gap: float) -> np.ndarray:
+    """Split ``lengths`` into consecutive runs that each fit ``capacity``; returns run index per entry."""
+    run = np.empty(len(lengths), dtype=np.int64)
+    start, index = 0, 0
+    # Fitting n entries needs sum(lengths[:n]) + (n - 1) * gap <= capacity
+    padded = np.cumsum(lengths + gap)
+    while start < len(lengths):
+        offset = padded[start - 1] if start else 0.0
+        count = max(int(np.searchsorted(padded, offset + capacity + gap, side="right")) - start, 1)
+        run[start:start + count] = index
+        start += count
+        index += 1
+    return run
+
+
+def pack(widths, heights, sheet_width: float, sheet_height: float, margin: float = 0, gap: float = 0) -> Layout:
+    """Place every item on a sheet; raises ValueError if one cannot fit on an empty sheet."""
+    widths = np.asarray(widths, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    usable_w, usable_h = sheet_width - 2 * margin, sheet_height - 2 * margin
+    too_big = np.flatnonzero((widths > usable_w) | (heights > usable_h))
+    if len(too_big):
+        raise ValueError(f"items at positions {too_big.tolist()} do not fit on a {sheet_width}x{sheet_height} sheet")
+
+    if not len(widths):
+        empty = np.empty(0)
+        return Layout(sheet_width, sheet_height, empty.astype(np.int64), empty, empty, widths, heights)
+
+    order = np.lexsort((-widths, -heights))  # tallest first, widest first among equals
+    w, h = widths[order], heights[order]
+
+    shelf = _runs(w, usable_w, gap)
+    # Items in a shelf sit left to right; shelf height is its first (tallest) item
+    first = np.r_[0, np.flatnonzero(np.diff(shelf)) + 1]
+    advance = np.cumsum(w + gap)
+    x_sorted = advance - (w + gap) - np.repeat((advance - (w + gap))[first], np.diff(np.r_[first, len(w)]))
+    shelf_heights = h[first]
+
+    page_of_shelf = _runs(shelf_heights, usable_h, gap)
+    first_shelf = np.r_[0, np.flatnonzero(np.diff(page_of_shelf)) + 1]
+    rise = np.cumsum(shelf_heights + gap)
+    shelf_top = rise - (shelf_heights + gap) - np.repeat(
+        (rise - (shelf_heights + gap))[first_shelf], np.diff(np.r_[first_shelf, len(shelf_heights)])
+    )
+
+    # Shelves fill from the top of the page down; items hang from the shelf's top edge
+    y_sorted = sheet_height - margin - shelf_top[shelf] - h
+    page = np.empty(len(w), dtype=np.int64)
+    x = np.empty(len(w))
+    y = np.empty(len(w))
+    page[order] = page_of_shelf[shelf]
+    x[order] = margin + x_sorted
+    y[order] = y_sorted
+    return Layout(sheet_width, sheet_height, page, x, y, widths, heights)
+
+
+def layout_crops(widths, heights) -> tuple[np.ndarray, np.ndarray]:
+    """Crop sizes as the single-item renders produce them (clamped to the base image)."""
+    sizes = np.array([crop_size(w, h) for w, h in zip(widths, heights)], dtype=np.float64).reshape(-1, 2)
+    return sizes[:, 0], sizes[:, 1]
+
+
+def render_layout_pdf(layout: Layout) -> bytes:
+    """Draw every crop of ``layout``, reusing one embedded base image. Blocking; use ``run_render``."""
+    base = load_base_image()
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(layout.sheet_width, layout.sheet_height))
+
+    c.beginForm(BASE_FORM, 0, 0, base.width, base.height)
+    # A JPEG path is embedded as-is (DCT stream), not re-encoded
+    c.drawImage(BASE_IMAGE_PATH, 0, 0, width=base.width, height=base.height)
+    c.endForm()
+
+    by_page = np.argsort(layout.page, kind="stable")
+    page_starts = np.searchsorted(layout.page[by_page], np.arange(layout.pages + 1))
+    for page in range(layout.pages):
+        for i in by_page[page_starts[page]:page_starts[page + 1]]:
+            x, y, w, h = float(layout.x[i]), float(layout.y[i]), float(layout.width[i]), float(layout.height[i])
+            c.saveState()
+            clip = c.beginPath()
+            clip.rect(x, y, w, h)
+            c.clipPath(clip, stroke=0, fill=0)
+            # The crop is the image's top-left w x h region: line the image's top-left corner up with the slot's
+            c.translate(x, y + h - base.height)
+            c.doForm(BASE_FORM)
+            c.restoreState()
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Awaitable, Callable, TypeVar
+
+from PIL import Image
+from reportlab import rl_config
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.config.config import settings
+
+T = TypeVar("T")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_IMAGE_PATH = settings.STATIC_IMAGE_PATH or os.path.join(APP_DIR, "static", "base_image.jpg")
+
+# Every PDF this app writes uses binary streams instead of ASCII85. Without
+# reportlab's C accelerator, encoding the multi-megabyte base JPEG dominated a
+# batch layout render, and ASCII85 inflates it by a quarter. reportlab only has
+# this as a process-wide option, so it is set here, where all renders start,
+# rather than per canvas.
+rl_config.useA85 = 0
+
+
+class RenderVariant(str, Enum):
+    pdf = "pdf"
+    pdf_compressed = "pdf_compressed"
+    thumbnail_png = "thumbnail_png"
+    thumbnail_webp = "thumbnail_webp"
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    extension: str
+    media_type: str
+
+
+VARIANTS = {
+    RenderVariant.pdf: VariantSpec("pdf", "application/pdf"),
+    RenderVariant.pdf_compressed: VariantSpec("min.pdf", "application/pdf"),
+    RenderVariant.thumbnail_png: VariantSpec("thumb.png", "image/png"),
+    RenderVariant.thumbnail_webp: VariantSpec("thumb.webp", "image/webp"),
+}
+
+# Lazily rendered variants are cached under keys derived from the render
+# inputs, e.g. "item_12_3f9a0c1b2d4e.thumb.webp"
+_VARIANT_KEY_RE = re.compile(r"^item_(\d+)_([0-9a-f]{12})\.(.+)$")
+# Item PDFs are keyed by render time, e.g. "item_12_20240101_120000.pdf"
+_PDF_KEY_RE = re.compile(r"^item_\d+_\d{8}_\d{6}\.pdf$")
+
+_executor: ThreadPoolExecutor | None = None
+_queued_renders = 0
+
+
+@functools.lru_cache(maxsize=1)
+def load_base_image() -> Image.Image:
+    """Decode the base image once per process; crops are taken from this copy."""
+    with Image.open(BASE_IMAGE_PATH) as img:
+        img.load()
+        return img.copy()
+
+
+def pdf_key(item_id: int) -> str:
+    """Storage key for a freshly rendered item PDF."""
+    return f"item_{item_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
+
+def render_fingerprint(width: float, height: float) -> str:
+    return hashlib.sha1(f"{float(width)!r}x{float(height)!r}".encode()).hexdigest()[:12]
+
+
+def variant_key(item_id: int, width: float, height: float, variant: RenderVariant) -> str:
+    return f"item_{item_id}_{render_fingerprint(width, height)}.{VARIANTS[variant].extension}"
+
+
+def variant_keys(item_id: int, width: float, height: float) -> list[str]:
+    """Keys of every lazily cached variant for the given render inputs."""
+    return [variant_key(item_id, width, height, v) for v in VARIANTS if v is not RenderVariant.pdf]
+
+
+def parse_variant_key(key: str) -> tuple[int, str] | None:
+    """Return ``(item_id, fingerprint)`` for a cached variant key, else None."""
+    match = _VARIANT_KEY_RE.match(key)
+    if not match or match.group(3) not in {spec.extension for spec in VARIANTS.values()}:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+def is_render_key(key: str) -> bool:
+    """Whether ``key`` names an item PDF or cached variant this app renders."""
+    return bool(_PDF_KEY_RE.match(key)) or parse_variant_key(key) is not None
+
+
+def crop_size(width: float, height: float) -> tuple[int, int]:
+    """Clamp the requested crop to the base image so PIL never pads out a larger raster."""
+    base = load_base_image()
+    return max(1, min(int(width), base.width)), max(1, min(int(height), base.height))
+
+
+def _crop(width: float, height: float) -> Image.Image:
+    return load_base_image().crop((0, 0, *crop_size(width, height)))
+
+
+def render_pdf(width: float, height: float, compressed: bool = False) -> bytes:
+    """Crop the base image and draw it into a PDF.
+
+    The compressed variant embeds the crop as a JPEG (DCT stream) instead of
+    the lossless image data reportlab writes for raw PIL images.
+    """
+    cropped_img = _crop(width, height)
+    if compressed:
+        jpeg = io.BytesIO()
+        cropped_img.convert("RGB").save(jpeg, "JPEG", quality=settings.COMPRESSED_PDF_JPEG_QUALITY, optimize=True)
+        jpeg.seek(0)
+        image = ImageReader(jpeg)
+    else:
+        image = ImageReader(cropped_img)
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    base = load_base_image()
+    c.drawImage(image, 50, 400, width=min(width, base.width), height=min(height, base.height))
+    c.drawString(50, 380, f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    c.save()
+    return buffer.getvalue()
+
+
+def render_thumbnail(width: float, height: float, image_format: str) -> bytes:
+    cropped_img = _crop(width, height)
+    cropped_img.thumbnail((settings.THUMBNAIL_MAX_SIZE, settings.THUMBNAIL_MAX_SIZE))
+    buffer = io.BytesIO()
+    cropped_img.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def render_variant(width: float, height: float, variant: RenderVariant) -> bytes:
+    """Render one output variant. Blocking; run it through ``run_render``."""
+    if variant is RenderVariant.pdf:
+        return render_pdf(width, height)
+    if variant is RenderVariant.pdf_compressed:
+        return render_pdf(width, height, compressed=True)
+    if variant is RenderVariant.thumbnail_png:
+        return render_thumbnail(width, height, "PNG")
+    return render_thumbnail(width, height, "WEBP")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.RENDER_THREADS, thread_name_prefix="render")
+    return _executor
+
+
+async def run_render(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a CPU-bound render on the render thread pool."""
+    global _queued_renders
+    loop = asyncio.get_running_loop()
+    _queued_renders += 1
+    try:
+        return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+    finally:
+        _queued_renders -= 1
+
+
+def base_image_cached() -> bool:
+    return load_base_image.cache_info().currsize > 0
+
+
+def render_queue_depth() -> int:
+    """Renders submitted to the pool that have not finished yet (running or waiting)."""
+    return _queued_renders
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+_inflight: dict[str, asyncio.Future] = {}
+_RETRY = object()
+
+
+async def single_flight(key: str, produce: Callable[[], Awaitable[None]]) -> None:
+    """Run ``produce`` once per key; concurrent callers for the same key wait on it.
+
+    If the leading caller is cancelled (e.g. its client disconnected), the
+    cancellation stays with it and one of the waiters takes over instead.
+    """
+    while True:
+        future = _inflight.get(key)
+        if future is None:
+            break
+        if await asyncio.shield(future) is not _RETRY:
+            return
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        await produce()
+    except asyncio.CancelledError:
+        del _inflight[key]
+        future.set_result(_RETRY)
+        raise
+    except BaseException as e:
+        del _inflight[key]
+        future.set_exception(e)
+        # Mark retrieved so an unawaited failure does not warn
+        future.exception()
+        raise
+    del _inflight[key]
+    future.set_result(None)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    produce: Callable[[], Awaitable[None]]
+    after: list[Callable[[], Awaitable[None]]] = field(default_factory=list)
+    handle: asyncio.TimerHandle | None = None
+    task: asyncio.Task | None = None
+    future: asyncio.Future | None = None
+
+
+class RenderScheduler:
+    """Debounces renders per key so rapid successive updates cost one render.
+
+    ``schedule`` (re)starts the key's quiet window and replaces the pending
+    ``produce`` with the newest one; only the last one scheduled in a window
+    runs. ``after`` callbacks from every coalesced call run once it succeeds,
+    so cleanup queued by superseded updates is not lost.
+    """
+
+    def __init__(self, debounce_seconds: float):
+        self.debounce_seconds = debounce_seconds
+        self._pending: dict[Hashable, _Pending] = {}
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def schedule(self, key: Hashable, produce: Callable[[], Awaitable[None]],
+                 after: Callable[[], Awaitable[None]] | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        entry = self._pending.get(key)
+        if entry is None or entry.task is not None:
+            # Nothing pending, or the previous render already started: queue a fresh one behind it
+            entry = self._pending[key] = _Pending(produce=produce, future=loop.create_future())
+        else:
+            entry.handle.cancel()
+            entry.produce = produce
+        if after is not None:
+            entry.after.append(after)
+        entry.handle = loop.call_later(self.debounce_seconds, self._start, key, entry)
+
+    def _start(self, key: Hashable, entry: _Pending) -> None:
+        entry.task = asyncio.create_task(self._run(key, entry))
+
+    async def _run(self, key: Hashable, entry: _Pending) -> None:
+        try:
+            await entry.produce()
+            for after in entry.after:
+                await after()
+        except asyncio.CancelledError:
+            entry.future.cancel()
+            raise
+        except Exception as e:
+            logger.exception("Scheduled render for %s failed", key)
+            entry.future.set_exception(e)
+            # Mark retrieved so a failure nobody flushes does not warn
+            entry.future.exception()
+        else:
+            entry.future.set_result(None)
+        finally:
+            if self._pending.get(key) is entry:
+                del self._pending[key]
+
+    def cancel(self, key: Hashable) -> None:
+        """Drop the key's render if it has not started, e.g. because the item was deleted."""
+        entry = self._pending.get(key)
+        if entry is not None and entry.task is None:
+            entry.handle.cancel()
+            entry.future.cancel()
+            del self._pending[key]
+
+    async def flush(self, key: Hashable) -> None:
+        """Run the key's pending render now and wait for it; raises if it failed."""
+        entry = self._pending.get(key)
+        if entry is None:
+            return
+        if entry.task is None:
+            entry.handle.cancel()
+            self._start(key, entry)
+        await asyncio.shield(entry.future)
+
+    def cancel_all(self) -> None:
+        """Abandon every pending and running render, e.g. when the shutdown deadline passes."""
+        for key, entry in list(self._pending.items()):
+            if entry.task is None:
+                self.cancel(key)
+            else:
+                entry.task.cancel()
+
+    async def flush_all(self) -> None:
+        """Run every pending render now, e.g. before shutdown."""
+        for key in list(self._pending):
+            try:
+                await self.flush(key)
+            except Exception:
+                pass  # Already logged by _run
+
+
+render_scheduler = RenderScheduler(settings.RENDER_DEBOUNCE_SECONDS)
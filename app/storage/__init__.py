@@ -0,0 +1,49 @@
+import logging
+from functools import lru_cache
+
+from app.config.config import settings
+from app.storage.base import ObjectNotFound, StorageBackend, StoredObject, is_temp_name, normalize_key
+from app.storage.local import ShardedLocalStorage
+from app.storage.s3 import S3Storage
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "ObjectNotFound",
+    "S3Storage",
+    "ShardedLocalStorage",
+    "StorageBackend",
+    "StoredObject",
+    "discard_files",
+    "get_storage",
+    "is_temp_name",
+    "normalize_key",
+]
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """Build the storage driver selected by ``STORAGE_BACKEND``."""
+    if settings.STORAGE_BACKEND == "local":
+        return ShardedLocalStorage(settings.GENERATED_PDF_DIR, depth=settings.STORAGE_SHARD_DEPTH)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND!r}")
+
+
+async def discard_files(keys: list[str]) -> None:
+    """Delete files that are no longer referenced, typically after the DB commit as a background task."""
+    storage = get_storage()
+    for key in keys:
+        try:
+            await storage.delete(normalize_key(key))
+        except Exception:
+            # Left for the storage reconciliation job to pick up
+            logger.exception("Failed to delete stored file %s", key)
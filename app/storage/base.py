@@ -0,0 +1,72 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+# Rows written before the storage layer existed hold paths such as
+# "app/generated_pdfs/item_1_20251005_215640.pdf" instead of bare keys.
+LEGACY_PREFIX = "app/generated_pdfs/"
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class ObjectNotFound(LookupError):
+    """Raised when a storage key does not exist."""
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    """An entry found while listing a backend.
+
+    ``location`` is driver specific (file path, object name) and is what
+    ``discard`` removes, so leftovers that are not valid keys can be cleaned.
+    """
+    key: str
+    size: int
+    modified_at: float
+    location: str
+
+
+def is_temp_name(name: str) -> bool:
+    """Leftovers from interrupted writes: old ``temp_<id>.jpg`` crops and ``.<key>.<uuid>.tmp`` files."""
+    return (name.startswith("temp_") and name.endswith(".jpg")) or (name.startswith(".") and name.endswith(".tmp"))
+
+
+def normalize_key(key: str) -> str:
+    """Turn a stored ``pdf_path`` (legacy relative path or bare key) into a storage key."""
+    if key.startswith(LEGACY_PREFIX):
+        key = key[len(LEGACY_PREFIX):]
+    if not key or "/" in key or "\\" in key or key.startswith("."):
+        raise ValueError(f"Invalid storage key: {key!r}")
+    return key
+
+
+class StorageBackend(ABC):
+    """Async interface every PDF storage driver implements."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        """Store ``data`` under ``key``, replacing any existing object."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Return the full object, raising ``ObjectNotFound`` if missing."""
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Yield the object in chunks, raising ``ObjectNotFound`` if missing."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Remove the object. Returns False if it did not exist."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Check whether ``key`` is stored."""
+
+    @abstractmethod
+    def iter_objects(self, batch_size: int = 500) -> AsyncIterator[list[StoredObject]]:
+        """Walk every stored entry, yielding at most ``batch_size`` at a time."""
+
+    @abstractmethod
+    async def discard(self, obj: StoredObject) -> None:
+        """Remove an entry returned by ``iter_objects``."""
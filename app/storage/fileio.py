@@ -0,0 +1,33 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.config.config import settings
+
+T = TypeVar("T")
+
+# Dedicated pool so slow (e.g. NFS) filesystem calls neither block the event
+# loop nor starve the default executor used by the rest of the app.
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.FILE_IO_THREADS, thread_name_prefix="file-io")
+    return _executor
+
+
+async def run_io(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking filesystem call on the file I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown() -> None:
+    """Wait for queued file operations to finish; the pool is recreated on next use."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,123 @@
+import hashlib
+import itertools
+import os
+import uuid
+from typing import AsyncIterator, Iterator
+
+from app.storage.base import DEFAULT_CHUNK_SIZE, ObjectNotFound, StorageBackend, StoredObject, normalize_key
+from app.storage.fileio import run_io
+
+
+class ShardedLocalStorage(StorageBackend):
+    """Local-directory driver that spreads files over hash-named subdirectories.
+
+    A key is stored at ``<root>/<h[0:2]>/<h[2:4]>/<key>`` where ``h`` is the
+    SHA-1 of the key, so no directory grows beyond a few thousand entries.
+    Files written by the old flat layout (``<root>/<key>``) are still found.
+    """
+
+    def __init__(self, root: str, depth: int = 2):
+        self.root = os.path.abspath(root)
+        self.depth = depth
+
+    def shard_path(self, key: str) -> str:
+        key = normalize_key(key)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.depth)]
+        return os.path.join(self.root, *shards, key)
+
+    def _resolve(self, key: str) -> str | None:
+        path = self.shard_path(key)
+        if os.path.isfile(path):
+            return path
+        legacy_path = os.path.join(self.root, normalize_key(key))
+        if os.path.isfile(legacy_path):
+            return legacy_path
+        return None
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self.shard_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a sibling temp file and rename so readers never see partial files
+        tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _read(self, key: str) -> bytes:
+        path = self._resolve(key)
+        if path is None:
+            raise ObjectNotFound(key)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _remove(self, key: str) -> bool:
+        path = self._resolve(key)
+        if path is None:
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await run_io(self._write, key, data)
+
+    async def get(self, key: str) -> bytes:
+        return await run_io(self._read, key)
+
+    async def stream(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        path = await run_io(self._resolve, key)
+        if path is None:
+            raise ObjectNotFound(key)
+        f = await run_io(open, path, "rb")
+        try:
+            while chunk := await run_io(f.read, chunk_size):
+                yield chunk
+        finally:
+            await run_io(f.close)
+
+    async def delete(self, key: str) -> bool:
+        return await run_io(self._remove, key)
+
+    async def exists(self, key: str) -> bool:
+        return await run_io(self._resolve, key) is not None
+
+    def _walk(self) -> Iterator[StoredObject]:
+        # Files are yielded as soon as they are seen; only subdirectory names are
+        # kept, so a huge legacy flat directory is never held in memory.
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = os.scandir(directory)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield StoredObject(entry.name, stat.st_size, stat.st_mtime, entry.path)
+
+    async def iter_objects(self, batch_size: int = 500) -> AsyncIterator[list[StoredObject]]:
+        walker = self._walk()
+        while batch := await run_io(lambda: list(itertools.islice(walker, batch_size))):
+            yield batch
+
+    async def discard(self, obj: StoredObject) -> None:
+        try:
+            await run_io(os.remove, obj.location)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from app.db import models
+from app.render.renderer import is_render_key, parse_variant_key, render_fingerprint
+from app.storage.base import LEGACY_PREFIX, StorageBackend, StoredObject, is_temp_name
+
+logger = logging.getLogger(__name__)
+
+# Crops the original renderer wrote next to its PDFs
+_LEGACY_TEMP_RE = re.compile(r"^temp_\d+\.jpg$")
+
+
+@dataclass
+class ReconcileReport:
+    scanned: int = 0
+    referenced: int = 0
+    skipped_recent: int = 0
+    skipped_foreign: int = 0
+    orphans_deleted: int = 0
+    temp_deleted: int = 0
+    bytes_reclaimed: int = 0
+
+
+def is_owned_key(key: str) -> bool:
+    """Whether this app could have written ``key``.
+
+    Storage may be shared (an S3 bucket without S3_PREFIX), so anything else
+    is never deleted, however old or unreferenced it is.
+    """
+    if is_temp_name(key):
+        if _LEGACY_TEMP_RE.match(key):
+            return True
+        # ".<key>.<uuid>.tmp" from an interrupted local write
+        key = key[1:].rsplit(".", 2)[0]
+    return is_render_key(key)
+
+
+async def _referenced_keys(session_maker, keys: list[str]) -> set[str]:
+    """Return which of ``keys`` are still in use.
+
+    PDFs are referenced by ``items.pdf_path`` (bare or legacy form); cached
+    render variants are in use while their item's dimensions still match the
+    fingerprint in the key.
+    """
+    variants = {key: parsed for key in keys if (parsed := parse_variant_key(key))}
+    pdf_keys = [key for key in keys if key not in variants]
+    referenced = set()
+    async with session_maker() as session:
+        if pdf_keys:
+            result = await session.scalars(
+                select(models.Item.pdf_path).where(
+                    models.Item.pdf_path.in_(pdf_keys + [LEGACY_PREFIX + key for key in pdf_keys])
+                )
+            )
+            referenced.update(path.removeprefix(LEGACY_PREFIX) for path in result)
+        if variants:
+            result = await session.execute(
+                select(models.Item.id, models.Item.width, models.Item.height).where(
+                    models.Item.id.in_({item_id for item_id, _ in variants.values()})
+                )
+            )
+            current = {row.id: render_fingerprint(row.width, row.height) for row in result}
+            referenced.update(key for key, (item_id, fp) in variants.items() if current.get(item_id) == fp)
+    return referenced
+
+
+async def reconcile_storage(
+    storage: StorageBackend,
+    session_maker,
+    batch_size: int = 500,
+    grace_seconds: float = 3600,
+    temp_max_age_seconds: float = 3600,
+    dry_run: bool = False,
+) -> ReconcileReport:
+    """Delete stored files no item references, plus stale temp files.
+
+    The backend is walked ``batch_size`` entries at a time and each batch is
+    checked with a single ``IN`` query, so memory stays bounded by the batch
+    no matter how many files or rows exist. Only keys this app writes are
+    considered (see ``is_owned_key``). Files younger than ``grace_seconds``
+    are kept because a render may have stored them before its ``pdf_path``
+    was committed.
+    """
+    report = ReconcileReport()
+    async for batch in storage.iter_objects(batch_size):
+        now = time.time()
+        to_delete: list[StoredObject] = []
+        candidates: list[StoredObject] = []
+        for obj in batch:
+            report.scanned += 1
+            age = now - obj.modified_at
+            if not is_owned_key(obj.key):
+                report.skipped_foreign += 1
+            elif is_temp_name(obj.key):
+                if age >= temp_max_age_seconds:
+                    to_delete.append(obj)
+                    report.temp_deleted += 1
+                else:
+                    report.skipped_recent += 1
+            elif age < grace_seconds:
+                report.skipped_recent += 1
+            else:
+                candidates.append(obj)
+
+        referenced = await _referenced_keys(session_maker, [obj.key for obj in candidates])
+        for obj in candidates:
+            if obj.key in referenced:
+                report.referenced += 1
+            else:
+                to_delete.append(obj)
+                report.orphans_deleted += 1
+
+        for obj in to_delete:
+            if not dry_run:
+                await storage.discard(obj)
+            report.bytes_reclaimed += obj.size
+    return report
+
+
+async def run_periodic_reconcile(storage: StorageBackend, session_maker, interval_seconds: float, **options) -> None:
+    """Background loop started from the app lifespan; cancelled on shutdown."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            report = await reconcile_storage(storage, session_maker, **options)
+            logger.info("Storage reconcile finished: %s", report)
+        except Exception:
+            logger.exception("Storage reconcile failed")
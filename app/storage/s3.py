@@ -0,0 +1,123 @@
+from typing import Any, AsyncIterator
+
+from app.storage.base import DEFAULT_CHUNK_SIZE, ObjectNotFound, StorageBackend, StoredObject, normalize_key
+from app.storage.fileio import run_io
+
+try:
+    import boto3
+except ImportError:  # boto3 is only needed when STORAGE_BACKEND=s3
+    boto3 = None
+
+_MISSING_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+def _is_missing(exc: Exception) -> bool:
+    response = getattr(exc, "response", None) or {}
+    return str(response.get("Error", {}).get("Code")) in _MISSING_CODES
+
+
+class S3Storage(StorageBackend):
+    """Driver for S3-compatible object stores (AWS S3, MinIO, moto server, ...).
+
+    The blocking boto3 client runs in worker threads. Pass ``client`` to use a
+    pre-built client or a local stand-in exposing the same methods.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client: Any = None,
+        endpoint_url: str | None = None,
+        region_name: str | None = None,
+        access_key_id: str | None = None,
+        secret_access_key: str | None = None,
+    ):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("boto3 is required for the S3 storage backend")
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region_name,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def object_name(self, key: str) -> str:
+        key = normalize_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    async def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await run_io(
+            self.client.put_object,
+            Bucket=self.bucket, Key=self.object_name(key), Body=data, ContentType=content_type,
+        )
+
+    async def _get_body(self, key: str):
+        try:
+            response = await run_io(self.client.get_object, Bucket=self.bucket, Key=self.object_name(key))
+        except Exception as e:
+            if _is_missing(e):
+                raise ObjectNotFound(key) from e
+            raise
+        return response["Body"]
+
+    async def get(self, key: str) -> bytes:
+        body = await self._get_body(key)
+        try:
+            return await run_io(body.read)
+        finally:
+            body.close()
+
+    async def stream(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        body = await self._get_body(key)
+        try:
+            while chunk := await run_io(body.read, chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str) -> bool:
+        if not await self.exists(key):
+            return False
+        await run_io(self.client.delete_object, Bucket=self.bucket, Key=self.object_name(key))
+        return True
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await run_io(self.client.head_object, Bucket=self.bucket, Key=self.object_name(key))
+        except Exception as e:
+            if _is_missing(e):
+                return False
+            raise
+        return True
+
+    async def iter_objects(self, batch_size: int = 500) -> AsyncIterator[list[StoredObject]]:
+        # Keys are flat under the prefix; the delimiter leaves out anything
+        # nested deeper, which belongs to someone else sharing the bucket
+        params = {"Bucket": self.bucket, "MaxKeys": batch_size, "Delimiter": "/"}
+        if self.prefix:
+            params["Prefix"] = f"{self.prefix}/"
+        while True:
+            page = await run_io(self.client.list_objects_v2, **params)
+            batch = [
+                StoredObject(
+                    key=entry["Key"].rsplit("/", 1)[-1],
+                    size=entry["Size"],
+                    modified_at=entry["LastModified"].timestamp(),
+                    location=entry["Key"],
+                )
+                for entry in page.get("Contents", [])
+            ]
+            if batch:
+                yield batch
+            if not page.get("IsTruncated"):
+                break
+            params["ContinuationToken"] = page["NextContinuationToken"]
+
+    async def discard(self, obj: StoredObject) -> None:
+        await run_io(self.client.delete_object, Bucket=self.bucket, Key=obj.location)
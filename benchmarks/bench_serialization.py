@@ -0,0 +1,99 @@
+"""Compare the ORM + response_model list path with the column-projected fast path.
+
+Runs against an in-memory SQLite database so it needs no server:
+
+    python benchmarks/bench_serialization.py --rows 50000 --repeat 5
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.api.items import item_list_adapter
+from app.db.queries import ITEM_FIELDS, select_items
+from app.api.serialization import rows_response
+from app.config.config import settings
+from app.db import models, schemas
+from app.db.database import Base
+
+
+def seed(engine, rows: int):
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(models.Material), [{"name": "Steel"}])
+        session.execute(insert(models.ProductType), [{"name": "Panel"}])
+        session.execute(insert(models.Item), [
+            {
+                "material_id": 1,
+                "product_type_id": 1,
+                "width": round(random.uniform(10, 2000), 2),
+                "height": round(random.uniform(10, 2000), 2),
+                "pdf_path": f"item_{i}_20250101_000000.pdf",
+            }
+            for i in range(1, rows + 1)
+        ])
+        session.commit()
+
+
+def orm_path(engine, field) -> tuple[float, float]:
+    """What read_items did before: full entities, then response_model validation and JSONResponse."""
+    with Session(engine) as session:
+        start = time.perf_counter()
+        items = session.execute(select(models.Item)).scalars().all()
+        loaded = time.perf_counter()
+        content = asyncio.run(serialize_response(field=field, response_content=items))
+        JSONResponse(content).body
+        return loaded - start, time.perf_counter() - loaded
+
+
+def fast_path(engine) -> tuple[float, float]:
+    with Session(engine) as session:
+        start = time.perf_counter()
+        rows = session.execute(select_items).all()
+        loaded = time.perf_counter()
+        rows_response(rows, ITEM_FIELDS, item_list_adapter).body
+        return loaded - start, time.perf_counter() - loaded
+
+
+def best(fn, repeat: int) -> tuple[float, float]:
+    runs = [fn() for _ in range(repeat)]
+    return min(r[0] for r in runs), min(r[1] for r in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, args.rows)
+    field = create_response_field(name="Response_Read_Items", type_=list[schemas.ItemRead], mode="serialization")
+
+    results = {"orm + response_model": best(lambda: orm_path(engine, field), args.repeat)}
+    settings.FAST_PATH_VALIDATE = True
+    results["columns + TypeAdapter batch"] = best(lambda: fast_path(engine), args.repeat)
+    settings.FAST_PATH_VALIDATE = False
+    results["columns + orjson (trusted)"] = best(lambda: fast_path(engine), args.repeat)
+
+    baseline = sum(results["orm + response_model"])
+    print(f"{args.rows} items, best of {args.repeat}")
+    print(f"{'path':<30}{'load ms':>10}{'encode ms':>12}{'total ms':>10}{'speedup':>9}")
+    for name, (load, encode) in results.items():
+        total = load + encode
+        print(f"{name:<30}{load * 1000:>10.1f}{encode * 1000:>12.1f}{total * 1000:>10.1f}{baseline / total:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+-- Revert 0001_query_indexes.up.sql (MySQL 8).
+
+ALTER TABLE users ADD INDEX ix_users_id (id);
+ALTER TABLE materials ADD INDEX ix_materials_id (id);
+ALTER TABLE product_types ADD INDEX ix_product_types_id (id);
+
+ALTER TABLE token_sessions
+    ADD INDEX ix_token_sessions_id (id),
+    ADD INDEX user_id (user_id);
+
+ALTER TABLE token_sessions DROP INDEX ix_token_sessions_user_id;
+
+ALTER TABLE items
+    ADD INDEX ix_items_id (id),
+    ADD INDEX material_id (material_id),
+    ADD INDEX product_type_id (product_type_id);
+
+ALTER TABLE items
+    DROP INDEX ix_items_material_id_id,
+    DROP INDEX ix_items_product_type_id_id,
+    DROP INDEX ix_items_pdf_path;
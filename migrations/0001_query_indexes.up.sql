@@ -0,0 +1,52 @@
+-- Indexes for the items/token_sessions query shapes (MySQL 8), for databases
+-- created by create_all before this change.
+--
+-- items:           filter by material_id or product_type_id, ordered by id;
+--                  EXISTS reference checks when deleting materials/product types;
+--                  pdf_path IN (...) lookups from the storage reconciliation job.
+-- token_sessions:  lookups by user_id.
+--
+-- Dropped:
+--   ix_<table>_id                 duplicated the primary keys, only adding write cost.
+--   material_id, product_type_id, user_id
+--                                 single-column indexes InnoDB created implicitly for the
+--                                 foreign keys; the new indexes lead with the same column.
+-- materials.name / product_types.name already have unique indexes and need nothing.
+--
+-- InnoDB may drop an implicit foreign key index by itself as soon as another
+-- index covers the column, so those drops only run if the index is still there.
+
+ALTER TABLE items
+    ADD INDEX ix_items_material_id_id (material_id, id),
+    ADD INDEX ix_items_product_type_id_id (product_type_id, id),
+    ADD INDEX ix_items_pdf_path (pdf_path),
+    DROP INDEX ix_items_id;
+
+SET @ddl = (SELECT IF(COUNT(*) > 0, 'ALTER TABLE items DROP INDEX material_id', 'DO 0')
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'items' AND index_name = 'material_id');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ddl = (SELECT IF(COUNT(*) > 0, 'ALTER TABLE items DROP INDEX product_type_id', 'DO 0')
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'items' AND index_name = 'product_type_id');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+ALTER TABLE token_sessions
+    ADD INDEX ix_token_sessions_user_id (user_id),
+    DROP INDEX ix_token_sessions_id;
+
+SET @ddl = (SELECT IF(COUNT(*) > 0, 'ALTER TABLE token_sessions DROP INDEX user_id', 'DO 0')
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'token_sessions' AND index_name = 'user_id');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+ALTER TABLE users DROP INDEX ix_users_id;
+ALTER TABLE materials DROP INDEX ix_materials_id;
+ALTER TABLE product_types DROP INDEX ix_product_types_id;
@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.db.database import async_session_maker
+from app.storage import get_storage
+from app.storage.reconcile import reconcile_storage
+
+async def reconcile(args):
+    report = await reconcile_storage(
+        get_storage(),
+        async_session_maker,
+        batch_size=args.batch_size,
+        grace_seconds=args.grace_seconds,
+        temp_max_age_seconds=args.temp_max_age,
+        dry_run=args.dry_run,
+    )
+    prefix = "🔎 Dry run:" if args.dry_run else "✅ Storage reconciled:"
+    print(f"{prefix} scanned {report.scanned} files, kept {report.referenced} referenced "
+          f"and {report.skipped_recent} recent, ignored {report.skipped_foreign} not written by the app, removed {report.orphans_deleted} orphaned PDFs "
+          f"and {report.temp_deleted} temp files, reclaimed {report.bytes_reclaimed} bytes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete PDFs no item references and stale temp files")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--grace-seconds", type=float, default=3600,
+                        help="keep files younger than this (renders not yet committed)")
+    parser.add_argument("--temp-max-age", type=float, default=3600)
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(reconcile(parser.parse_args()))
@@ -0,0 +1,110 @@
+import pytest
+import uuid
+from sqlalchemy import event
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from app.main import app
+from app.config import utils
+from app.db.database import engine
+from app.db.principals import principals
+
+
+@pytest.mark.asyncio
+@pytest.mark.real_transactions
+async def test_password_hashing_does_not_hold_a_db_connection(monkeypatch):
+    """Register and login release their connection before bcrypt runs"""
+    checked_out = []
+    original_hash, original_verify = utils.hash_password, utils.verify_password
+
+    def recording_hash(password):
+        checked_out.append(engine.pool.checkedout())
+        return original_hash(password)
+
+    def recording_verify(password, hashed):
+        checked_out.append(engine.pool.checkedout())
+        return original_verify(password, hashed)
+
+    monkeypatch.setattr(utils, "hash_password", recording_hash)
+    monkeypatch.setattr(utils, "verify_password", recording_verify)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            credentials = {"username": f"user_{uuid.uuid4().hex[:8]}", "password": "secret-pass"}
+            res = await client.post("/auth/register", json=credentials)
+            assert res.status_code == 200, res.text
+            res = await client.post("/auth/login", json=credentials)
+            assert res.status_code == 200, res.text
+            assert res.json()["access_token"]
+
+    assert checked_out == [0, 0]
+
+
+async def login(client, credentials):
+    res = await client.post("/auth/login", json=credentials)
+    assert res.status_code == 200, res.text
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_authorized_requests_are_served_from_the_principal_cache():
+    """After the first lookup /auth/me runs no query; logout revokes the token at once"""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            credentials = {"username": f"user_{uuid.uuid4().hex[:8]}", "password": "secret-pass"}
+            res = await client.post("/auth/register", json=credentials)
+            assert res.status_code == 200, res.text
+            headers = await login(client, credentials)
+
+            res = await client.get("/auth/me", headers=headers)
+            assert res.json()["username"] == credentials["username"]
+            event.listen(engine.sync_engine, "before_cursor_execute", record)
+            try:
+                for _ in range(3):
+                    res = await client.get("/auth/me", headers=headers)
+                    assert res.status_code == 200, res.text
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", record)
+            assert statements == []
+            assert principals.hits == 3
+
+            assert (await client.get("/auth/me")).status_code == 401
+            assert (await client.get("/auth/me", headers={"Authorization": "Bearer nonsense"})).status_code == 401
+
+            token = headers["Authorization"][7:]
+            res = await client.post("/auth/logout", params={"token": token})
+            assert res.status_code == 200, res.text
+            res = await client.get("/auth/me", headers=headers)
+            assert res.status_code == 401
+            assert res.headers["www-authenticate"] == "Bearer"
+
+
+@pytest.mark.asyncio
+async def test_password_change_revokes_other_sessions():
+    """Changing the password ends every other login, keeps the current one and takes the new password"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            credentials = {"username": f"user_{uuid.uuid4().hex[:8]}", "password": "secret-pass"}
+            await client.post("/auth/register", json=credentials)
+            current = await login(client, credentials)
+            other = await login(client, credentials)
+            assert (await client.get("/auth/me", headers=other)).status_code == 200
+
+            body = {"current_password": "wrong", "new_password": "new-secret"}
+            res = await client.post("/auth/change-password", json=body, headers=current)
+            assert res.status_code == 401
+
+            body["current_password"] = credentials["password"]
+            res = await client.post("/auth/change-password", json=body, headers=current)
+            assert res.status_code == 200, res.text
+
+            assert (await client.get("/auth/me", headers=other)).status_code == 401
+            assert (await client.get("/auth/me", headers=current)).status_code == 200
+            assert (await client.post("/auth/login", json=credentials)).status_code == 401
+            await login(client, {"username": credentials["username"], "password": "new-secret"})
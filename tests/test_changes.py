@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+import uuid
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from sqlalchemy import insert
+from app.main import app
+from app.config.config import settings
+from app.db import models
+from app.db.changes import prune_change_log
+from app.db.database import async_session_maker
+
+
+@pytest.fixture
+def no_settle(monkeypatch):
+    monkeypatch.setattr(settings, "CHANGES_SETTLE_SECONDS", 0)
+
+
+@pytest.mark.asyncio
+async def test_changes_follow_writes_in_order(no_settle):
+    """Creates, updates and deletes appear after the head cursor in commit order; failed writes do not"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            head = (await client.get("/changes/head")).json()["cursor"]
+            name = f"Feed_{uuid.uuid4().hex[:6]}"
+            material = (await client.post("/materials/", json={"name": name})).json()
+            assert (await client.post("/materials/", json={"name": name})).status_code == 400
+            await client.put(f"/materials/{material['id']}", json={"name": f"{name}_v2"})
+            await client.delete(f"/materials/{material['id']}")
+
+            res = await client.get("/changes", params={"since": head})
+            assert res.status_code == 200, res.text
+            body = res.json()
+            assert [(c["entity"], c["entity_id"], c["op"]) for c in body["changes"]] == [
+                ("material", material["id"], "created"),
+                ("material", material["id"], "updated"),
+                ("material", material["id"], "deleted"),
+            ]
+            assert body["next"] == body["changes"][-1]["cursor"]
+
+            res = await client.get("/changes", params={"since": body["next"]})
+            assert res.json() == {"changes": [], "next": body["next"]}
+
+
+@pytest.mark.asyncio
+async def test_changes_long_poll_wakes_on_commit(no_settle):
+    """A waiting request returns as soon as a change commits instead of waiting out its timeout"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            head = (await client.get("/changes/head")).json()["cursor"]
+            poll = asyncio.create_task(client.get("/changes", params={"since": head, "wait": 10}))
+            await asyncio.sleep(0.1)
+            assert not poll.done()
+
+            started = asyncio.get_running_loop().time()
+            await client.post("/product-types/", json={"name": f"Feed_{uuid.uuid4().hex[:6]}"})
+            res = await asyncio.wait_for(poll, timeout=5)
+            assert asyncio.get_running_loop().time() - started < 2
+            assert [c["op"] for c in res.json()["changes"]] == ["created"]
+
+
+@pytest.mark.asyncio
+async def test_pruned_cursor_gets_410(no_settle):
+    """After retention pruning, cursors older than the compaction marker must resync in full"""
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    async with async_session_maker() as session:
+        await session.execute(insert(models.ChangeLog), [
+            {"entity": "material", "entity_id": 1, "op": "updated", "created_at": old} for _ in range(3)
+        ])
+        await session.commit()
+
+    removed = await prune_change_log(async_session_maker, retention_seconds=24 * 3600)
+    assert removed >= 2
+
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            res = await client.get("/changes", params={"since": 0})
+            assert res.status_code == 410
+
+            head = (await client.get("/changes/head")).json()["cursor"]
+            res = await client.get("/changes", params={"since": head})
+            assert res.status_code == 200
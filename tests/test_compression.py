@@ -0,0 +1,108 @@
+import gzip
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from httpx import AsyncClient, ASGITransport
+from app.middleware.compression import CompressionMiddleware, CompressionStats, negotiate
+
+
+def build_app(stats: CompressionStats):
+    app = FastAPI()
+
+    @app.get("/list")
+    async def big_list():
+        return [{"id": i, "name": f"item {i}", "material": "oak"} for i in range(500)]
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/pdf")
+    async def pdf():
+        return Response(b"%PDF-" + b"0" * 5000, media_type="application/pdf")
+
+    @app.get("/files/report")
+    async def excluded():
+        return Response(b"a" * 5000, media_type="text/plain")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"data: {'x' * 100} {i}\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500, exclude_paths=[r"/files/.+"], stats=stats)
+    return app
+
+
+def test_negotiate_honours_q_values_and_server_preference():
+    """The highest q-value wins; ties and wildcards fall back to the server's order; q=0 refuses"""
+    supported = ["br", "gzip"]
+    assert negotiate("gzip, br", supported) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", supported) == "gzip"
+    assert negotiate("*;q=0.1", supported) == "br"
+    assert negotiate("br;q=0, *", supported) == "gzip"
+    assert negotiate("identity", supported) is None
+    assert negotiate("deflate, gzip;q=0", ["gzip"]) is None
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_compressed_and_small_or_opted_out_ones_are_not():
+    """Lists above the threshold are gzipped with the right length; small bodies, PDFs and excluded paths are not"""
+    stats = CompressionStats()
+    transport = ASGITransport(app=build_app(stats))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.get("/list", headers={"accept-encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.headers["vary"] == "Accept-Encoding"
+        assert int(res.headers["content-length"]) < len(res.content) / 5
+        assert len(res.json()) == 500
+
+        for path in ("/small", "/pdf", "/files/report"):
+            res = await client.get(path, headers={"accept-encoding": "gzip"})
+            assert "content-encoding" not in res.headers, path
+
+        res = await client.get("/list", headers={"accept-encoding": "identity"})
+        assert "content-encoding" not in res.headers
+
+    snapshot = stats.snapshot()
+    assert snapshot["encodings"]["gzip"]["responses"] == 1
+    assert snapshot["encodings"]["gzip"]["ratio"] > 5
+    assert snapshot["skipped"] == {"too_small": 1, "content_type": 1}
+
+
+@pytest.mark.asyncio
+async def test_streamed_responses_are_compressed_chunk_by_chunk():
+    """Each streamed chunk is flushed as it is sent and the whole stream decodes to the original body"""
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        for i in range(3):
+            await send({"type": "http.response.body", "body": f"chunk {i} ".encode() * 100, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def record(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app, minimum_size=500, stats=CompressionStats())(scope, None, record)
+
+    start, *bodies = sent
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    assert not any(name == b"content-length" for name, _ in start["headers"])
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for i, message in enumerate(bodies[:3]):
+        # A sync flush makes each chunk decodable on arrival
+        assert decoder.decompress(message["body"]) == f"chunk {i} ".encode() * 100
+    assert gzip.decompress(b"".join(m["body"] for m in bodies)) == b"".join(
+        f"chunk {i} ".encode() * 100 for i in range(3)
+    )
+
+    transport = ASGITransport(app=build_app(CompressionStats()))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.get("/stream", headers={"accept-encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.text.count("data: ") == 3
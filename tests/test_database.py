@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app.config.config import Settings
+from app.db import models
+from app.db.database import Base, create_engine_for
+
+
+def test_database_url_follows_backend():
+    """DB_BACKEND picks the driver URL; unknown backends are rejected"""
+    assert Settings(DB_BACKEND="sqlite", SQLITE_PATH="/tmp/x.db").DATABASE_URL == "sqlite+aiosqlite:////tmp/x.db"
+    assert Settings(DB_BACKEND="memory").DATABASE_URL == "sqlite+aiosqlite://"
+    assert Settings(DB_BACKEND="mysql").DATABASE_URL.startswith("mysql+aiomysql://")
+    with pytest.raises(ValueError):
+        Settings(DB_BACKEND="postgres").DATABASE_URL
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_keeps_data_across_sessions_and_enforces_foreign_keys():
+    """The in-memory backend shares one database between sessions and rejects dangling references like MySQL"""
+    engine = create_engine_for("memory", "sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.ChangeLog).values(entity="item", entity_id=1, op="created"))
+        async with engine.connect() as conn:
+            row = (await conn.execute(select(models.ChangeLog))).one()
+            assert row.op == "created" and row.created_at is not None  # server_default timestamp
+
+        with pytest.raises(IntegrityError):
+            async with engine.begin() as conn:
+                await conn.execute(insert(models.Item).values(material_id=999, width=1, height=1))
+    finally:
+        await engine.dispose()
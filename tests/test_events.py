@@ -0,0 +1,77 @@
+import asyncio
+import orjson
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from app.main import app
+from app.events import EventHub, event_hub
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], orjson.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_evicted_without_blocking_others():
+    """A subscriber whose buffer fills is dropped with an end marker; other subscribers keep receiving"""
+    hub = EventHub(buffer_size=2)
+    slow = hub.subscribe()
+    fast = hub.subscribe(item_id=1)
+    other = hub.subscribe(item_id=2)
+
+    for _ in range(3):
+        hub.publish("updated", 1)
+        if not fast.queue.empty():
+            fast.queue.get_nowait()
+
+    assert slow.evicted and hub.evictions == 1
+    assert hub.is_closed(slow.queue.get_nowait())
+    assert hub.subscriber_count() == 2
+    assert other.queue.empty()  # filtered to another item
+
+    hub.close()
+    assert hub.subscriber_count() == 0
+    assert hub.is_closed(fast.queue.get_nowait())
+
+
+@pytest.mark.asyncio
+async def test_item_events_stream():
+    """GET /items/events streams created and pdf-rendered events for a new item, filtered by item_id"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material = (await client.post("/materials/", json={"name": f"Mat_{uuid.uuid4().hex[:6]}"})).json()
+            product_type = (await client.post("/product-types/", json={"name": f"Type_{uuid.uuid4().hex[:6]}"})).json()
+
+            before = event_hub.subscriber_count()
+            stream = asyncio.create_task(client.get("/items/events"))
+            for _ in range(100):
+                if event_hub.subscriber_count() > before:
+                    break
+                await asyncio.sleep(0.01)
+            assert event_hub.subscriber_count() > before
+
+            res = await client.post("/items/", json={
+                "material_id": material["id"], "product_type_id": product_type["id"], "width": 30, "height": 30,
+            })
+            assert res.status_code == 200, res.text
+            item = res.json()
+
+            # Ending the hub ends the stream so the buffered response can be read
+            event_hub.close()
+            res = await asyncio.wait_for(stream, 10)
+            assert res.status_code == 200
+            assert res.headers["content-type"].startswith("text/event-stream")
+
+            events = [(e, d) for e, d in parse_events(res.text) if d["item_id"] == item["id"]]
+            assert events == [
+                ("created", {"item_id": item["id"]}),
+                ("pdf-rendered", {"item_id": item["id"], "pdf_path": item["pdf_path"]}),
+            ]
+            assert event_hub.subscriber_count() == before
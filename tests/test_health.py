@@ -0,0 +1,83 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from app.main import app
+from app.api import health
+from app.config.config import settings
+from app.db.pool import pool_stats
+
+
+@pytest.mark.asyncio
+async def test_healthz_has_no_dependencies(monkeypatch):
+    """/healthz answers without touching the database"""
+    async def fail():
+        raise AssertionError("healthz must not ping the database")
+
+    monkeypatch.setattr(health, "ping_database", fail)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            res = await client.get("/healthz")
+            assert res.status_code == 200
+            assert res.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_readyz_checks_and_caches_db_ping(monkeypatch):
+    """/readyz reports each check and reuses a recent DB ping instead of querying per probe"""
+    monkeypatch.setattr(health, "_last_ping", None)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            res = await client.get("/readyz")
+            assert res.status_code == 200, res.text
+            body = res.json()
+            assert body["status"] == "ready"
+            assert body["checks"] == {"lifecycle": True, "database": True, "render_pool": True, "base_image": True}
+
+            checkouts = pool_stats.snapshot()["checkouts"]
+            for _ in range(5):
+                assert (await client.get("/readyz")).status_code == 200
+            assert pool_stats.snapshot()["checkouts"] == checkouts
+
+
+@pytest.mark.asyncio
+async def test_readyz_unready_when_database_unreachable(monkeypatch):
+    """A failing DB ping makes /readyz return 503 with the error"""
+    async def failing_ping():
+        return "connection refused"
+
+    monkeypatch.setattr(health, "ping_database", failing_ping)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            res = await client.get("/readyz")
+            assert res.status_code == 503
+            assert res.json()["status"] == "degraded"
+            assert res.json()["checks"]["database"] is False
+            assert res.json()["database_error"] == "connection refused"
+
+
+@pytest.mark.asyncio
+async def test_debug_pool_reports_pool_and_wait_stats():
+    """/debug/pool exposes the engine pool counters and checkout wait statistics"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/materials/")
+            res = await client.get("/debug/pool")
+            assert res.status_code == 200
+            body = res.json()
+            assert {"pool_class", "size", "checked_out", "overflow", "wait"} <= body.keys()
+            assert body["wait"]["checkouts"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_debug_endpoints_are_hidden_when_disabled(monkeypatch):
+    """With DEBUG_ENDPOINTS_ENABLED off, /debug/* answer 404"""
+    monkeypatch.setattr(settings, "DEBUG_ENDPOINTS_ENABLED", False)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in ("/debug/pool", "/debug/compression"):
+                assert (await client.get(path)).status_code == 404, path
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_retry_with_same_key_replays_original_response():
+    """A retried POST with the same Idempotency-Key returns the first response without re-executing"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            payload = {"name": f"Idem_{uuid.uuid4().hex[:6]}", "description": "retry"}
+            headers = {"Idempotency-Key": uuid.uuid4().hex}
+
+            res1 = await client.post("/materials/", json=payload, headers=headers)
+            res2 = await client.post("/materials/", json=payload, headers=headers)
+            print("REPLAY:", res2.text)
+
+            assert res1.status_code == 200, res1.text
+            # Executing again would hit the unique name constraint and return 400
+            assert res2.status_code == 200, res2.text
+            assert res2.json() == res1.json()
+            assert res2.headers["idempotent-replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_same_key_with_different_body_is_rejected():
+    """Reusing a key for a different request body fails with 422"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"Idempotency-Key": uuid.uuid4().hex}
+            res1 = await client.post("/materials/", json={"name": f"IdemA_{uuid.uuid4().hex[:6]}"}, headers=headers)
+            res2 = await client.post("/materials/", json={"name": f"IdemB_{uuid.uuid4().hex[:6]}"}, headers=headers)
+
+            assert res1.status_code == 200
+            assert res2.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_in_flight_request():
+    """Concurrent duplicates share one execution and one created row"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            name = f"IdemC_{uuid.uuid4().hex[:6]}"
+            headers = {"Idempotency-Key": uuid.uuid4().hex}
+            responses = await asyncio.gather(*[
+                client.post("/materials/", json={"name": name}, headers=headers) for _ in range(5)
+            ])
+
+            assert all(res.status_code == 200 for res in responses)
+            assert len({res.json()["id"] for res in responses}) == 1
+            materials = (await client.get("/materials/")).json()
+            assert sum(m["name"] == name for m in materials) == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_without_key_are_not_cached():
+    """Without the header every POST executes normally"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            payload = {"name": f"IdemD_{uuid.uuid4().hex[:6]}"}
+            assert (await client.post("/materials/", json=payload)).status_code == 200
+            assert (await client.post("/materials/", json=payload)).status_code == 400
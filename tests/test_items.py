@@ -1,133 +1,362 @@
-import os
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
+import asyncio
+import io
+import pytest
+import uuid
 from PIL import Image
-from reportlab.pdfgen import canvas
-from app.db import models, schemas, database
-
-router = APIRouter(prefix="/items", tags=["items"])
-
-# Base directories
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-BASE_IMAGE_PATH = os.path.join(BASE_DIR, "static", "base_image.jpg")
-PDF_DIR = os.path.join(BASE_DIR, "generated_pdfs")
-os.makedirs(PDF_DIR, exist_ok=True)
-
-
-async def generate_pdf(item_id: int, width: float, height: float) -> str:
-    """Helper to crop image and generate PDF, returning relative path."""
-    try:
-        with Image.open(BASE_IMAGE_PATH) as img:
-            crop_box = (0, 0, int(width), int(height))
-            cropped_img = img.crop(crop_box)
-            temp_path = os.path.join(PDF_DIR, f"temp_{item_id}.jpg")
-            cropped_img.save(temp_path)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pdf_filename = f"item_{item_id}_{timestamp}.pdf"
-            pdf_path = os.path.join(PDF_DIR, pdf_filename)
-
-            c = canvas.Canvas(pdf_path)
-            c.drawImage(temp_path, 50, 400, width=width, height=height)
-            c.drawString(50, 380, f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            c.save()
-
-            os.remove(temp_path)
-            return f"app/generated_pdfs/{pdf_filename}"
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Image processing failed: {str(e)}")
-
-
-# CREATE
-@router.post("/", response_model=schemas.ItemRead)
-async def create_item(item: schemas.ItemCreate, db: AsyncSession = Depends(database.get_db)):
-    # Validate Material
-    result = await db.execute(select(models.Material).where(models.Material.id == item.material_id))
-    material = result.scalars().first()
-    if not material:
-        raise HTTPException(status_code=404, detail="Material not found")
-
-    # Validate Product Type
-    result = await db.execute(select(models.ProductType).where(models.ProductType.id == item.product_type_id))
-    pt = result.scalars().first()
-    if not pt:
-        raise HTTPException(status_code=404, detail="Product type not found")
-
-    # Create DB record
-    db_item = models.Item(
-        material_id=item.material_id,
-        product_type_id=item.product_type_id,
-        width=item.width,
-        height=item.height,
-        pdf_path=None
-    )
-    db.add(db_item)
-    await db.commit()
-    await db.refresh(db_item)
-
-    # Generate PDF
-    db_item.pdf_path = await generate_pdf(db_item.id, item.width, item.height)
-    await db.commit()
-    await db.refresh(db_item)
-
-    return db_item
-
-
-# READ ALL
-@router.get("/", response_model=list[schemas.ItemRead])
-async def read_items(db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Item))
-    return result.scalars().all()
-
-
-# READ ONE
-@router.get("/{item_id}", response_model=schemas.ItemRead)
-async def read_item(item_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Item).where(models.Item.id == item_id))
-    item = result.scalars().first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    return item
-
-
-# UPDATE
-@router.put("/{item_id}", response_model=schemas.ItemRead)
-async def update_item(item_id: int, item: schemas.ItemCreate, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Item).where(models.Item.id == item_id))
-    db_item = result.scalars().first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    # Update fields
-    db_item.material_id = item.material_id
-    db_item.product_type_id = item.product_type_id
-    db_item.width = item.width
-    db_item.height = item.height
-
-    # Regenerate PDF
-    db_item.pdf_path = await generate_pdf(db_item.id, item.width, item.height)
-
-    await db.commit()
-    await db.refresh(db_item)
-    return db_item
-
-
-# DELETE
-@router.delete("/{item_id}")
-async def delete_item(item_id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Item).where(models.Item.id == item_id))
-    db_item = result.scalars().first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    # Delete PDF if exists
-    if db_item.pdf_path:
-        pdf_full_path = os.path.join(BASE_DIR, os.path.relpath(db_item.pdf_path, "app"))
-        if os.path.exists(pdf_full_path):
-            os.remove(pdf_full_path)
-
-    await db.delete(db_item)
-    await db.commit()
-    return {"detail": "Item deleted"}
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from app.main import app
+from app.api import items as items_api
+from app.config.config import settings
+from app.render.renderer import RenderVariant, crop_size, load_base_image, variant_key
+from app.db import models
+from app.db.database import async_session_maker, engine
+from app.db.stats import StatsCache, item_stats
+from app.render.scheduler import render_scheduler
+from app.storage import get_storage
+
+
+async def create_refs(client):
+    material = await client.post("/materials/", json={"name": f"Mat_{uuid.uuid4().hex[:6]}"})
+    product_type = await client.post("/product-types/", json={"name": f"Type_{uuid.uuid4().hex[:6]}"})
+    return material.json()["id"], product_type.json()["id"]
+
+
+# --- CREATE + DOWNLOAD + DELETE ---
+@pytest.mark.asyncio
+async def test_item_pdf_lifecycle():
+    """Creating an item stores a PDF under a storage key that can be downloaded and is removed on delete"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            res = await client.post("/items/", json={
+                "material_id": material_id, "product_type_id": pt_id, "width": 120, "height": 80,
+            })
+            print("CREATE:", res.text)
+            assert res.status_code == 200, res.text
+            item = res.json()
+            assert item["pdf_path"].startswith(f"item_{item['id']}_")
+            assert "/" not in item["pdf_path"]
+
+            res = await client.get(f"/items/{item['id']}/pdf")
+            assert res.status_code == 200
+            assert res.headers["content-type"] == "application/pdf"
+            assert res.content.startswith(b"%PDF")
+
+            res = await client.delete(f"/items/{item['id']}")
+            assert res.status_code == 200
+
+            res = await client.get(f"/items/{item['id']}/pdf")
+            assert res.status_code == 404
+
+
+# --- UPDATE ---
+@pytest.mark.asyncio
+async def test_update_item_replaces_pdf():
+    """Updating an item renders a new PDF and removes the superseded one after commit"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            payload = {"material_id": material_id, "product_type_id": pt_id, "width": 50, "height": 40}
+            item = (await client.post("/items/", json=payload)).json()
+            storage = get_storage()
+            # Give the old file a distinct key even when both renders land in the same second
+            await storage.put("stale.pdf", await storage.get(item["pdf_path"]))
+            await storage.delete(item["pdf_path"])
+            async with async_session_maker() as session:
+                db_item = await session.get(models.Item, item["id"])
+                db_item.pdf_path = "stale.pdf"
+                await session.commit()
+
+            res = await client.put(f"/items/{item['id']}", json={**payload, "width": 60})
+            print("UPDATE:", res.text)
+            assert res.status_code == 200, res.text
+            assert res.json()["pdf_path"] != "stale.pdf"
+
+            # The render is debounced; downloading flushes it
+            assert (await client.get(f"/items/{item['id']}/pdf")).status_code == 200
+            assert await storage.exists(res.json()["pdf_path"])
+            assert not await storage.exists("stale.pdf")
+
+            await client.delete(f"/items/{item['id']}")
+
+
+@pytest.mark.asyncio
+async def test_update_without_render_changes_keeps_pdf(monkeypatch):
+    """Updates that leave width and height alone keep the existing PDF and do not render"""
+    renders = []
+    original = items_api.store_pdf
+
+    async def counting_store_pdf(key, width, height):
+        renders.append(key)
+        await original(key, width, height)
+
+    monkeypatch.setattr(items_api, "store_pdf", counting_store_pdf)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            other_material_id, _ = await create_refs(client)
+            payload = {"material_id": material_id, "product_type_id": pt_id, "width": 50, "height": 40}
+            item = (await client.post("/items/", json=payload)).json()
+            renders.clear()
+
+            res = await client.put(f"/items/{item['id']}", json=payload)
+            assert res.status_code == 200, res.text
+            res = await client.put(f"/items/{item['id']}", json={**payload, "material_id": other_material_id})
+            assert res.status_code == 200, res.text
+            assert res.json()["material_id"] == other_material_id
+            assert res.json()["pdf_path"] == item["pdf_path"]
+
+            assert (await client.get(f"/items/{item['id']}/pdf")).status_code == 200
+            assert renders == []
+
+            await client.delete(f"/items/{item['id']}")
+
+
+@pytest.mark.asyncio
+async def test_rapid_updates_coalesce_into_one_render(monkeypatch):
+    """Several updates inside the debounce window produce a single render of the last dimensions"""
+    renders = []
+    original = items_api.store_pdf
+
+    async def counting_store_pdf(key, width, height):
+        renders.append((width, height))
+        await original(key, width, height)
+
+    monkeypatch.setattr(items_api, "store_pdf", counting_store_pdf)
+    monkeypatch.setattr(render_scheduler, "debounce_seconds", 0.2)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            payload = {"material_id": material_id, "product_type_id": pt_id, "width": 50, "height": 40}
+            item = (await client.post("/items/", json=payload)).json()
+            renders.clear()
+
+            for width in (51, 52, 53):
+                res = await client.put(f"/items/{item['id']}", json={**payload, "width": width})
+                assert res.status_code == 200, res.text
+            pdf_path = res.json()["pdf_path"]
+
+            await asyncio.sleep(0.5)
+            assert renders == [(53, 40)]
+            storage = get_storage()
+            assert await storage.exists(pdf_path)
+            if pdf_path != item["pdf_path"]:
+                assert not await storage.exists(item["pdf_path"])
+
+            await client.delete(f"/items/{item['id']}")
+
+
+@pytest.mark.asyncio
+@pytest.mark.real_transactions
+async def test_render_does_not_hold_a_db_connection(monkeypatch):
+    """Creating, updating and downloading items render with no pooled connection checked out"""
+    checked_out = []
+    original = items_api.run_render
+
+    async def recording_run_render(*args, **kwargs):
+        checked_out.append(engine.pool.checkedout())
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(items_api, "run_render", recording_run_render)
+    monkeypatch.setattr(settings, "RENDER_DEBOUNCE_SECONDS", 0)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            payload = {"material_id": material_id, "product_type_id": pt_id, "width": 50, "height": 40}
+            item = (await client.post("/items/", json=payload)).json()
+            res = await client.put(f"/items/{item['id']}", json={**payload, "width": 70})
+            assert res.status_code == 200, res.text
+            res = await client.get(f"/items/{item['id']}/files/thumbnail_png")
+            assert res.status_code == 200
+
+            assert len(checked_out) == 3
+            assert checked_out == [0, 0, 0]
+
+            await client.delete(f"/items/{item['id']}")
+
+
+# --- RENDER VARIANTS ---
+@pytest.mark.asyncio
+async def test_item_variants_rendered_lazily_and_cached():
+    """Thumbnails and the compressed PDF are rendered on first request, then served from storage"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            item = (await client.post("/items/", json={
+                "material_id": material_id, "product_type_id": pt_id, "width": 300, "height": 200,
+            })).json()
+            storage = get_storage()
+            key = variant_key(item["id"], 300, 200, RenderVariant.thumbnail_webp)
+            assert not await storage.exists(key)
+
+            res = await client.get(f"/items/{item['id']}/files/thumbnail_webp")
+            assert res.status_code == 200, res.text
+            assert res.headers["content-type"] == "image/webp"
+            assert res.headers["etag"] == f'"{key}"'
+            assert await storage.exists(key)
+            with Image.open(io.BytesIO(res.content)) as thumb:
+                assert max(thumb.size) <= settings.THUMBNAIL_MAX_SIZE
+
+            res = await client.get(f"/items/{item['id']}/files/thumbnail_png")
+            assert res.headers["content-type"] == "image/png"
+
+            full = await client.get(f"/items/{item['id']}/files/pdf")
+            compressed = await client.get(f"/items/{item['id']}/files/pdf_compressed")
+            assert compressed.content.startswith(b"%PDF")
+            assert len(compressed.content) < len(full.content)
+
+            res = await client.get(f"/items/{item['id']}/files/unknown")
+            assert res.status_code == 422
+
+            await client.delete(f"/items/{item['id']}")
+            assert not await storage.exists(key)
+
+
+# --- INPUT BOUNDS ---
+@pytest.mark.asyncio
+async def test_item_dimensions_rejected_before_db_write():
+    """Non-positive or oversized dimensions fail validation and no row is created"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            before = len((await client.get("/items/")).json())
+            for width, height in ((-5, 10), (0, 10), (10, settings.ITEM_MAX_HEIGHT + 1), (1e12, 1e12)):
+                res = await client.post("/items/", json={
+                    "material_id": material_id, "product_type_id": pt_id, "width": width, "height": height,
+                })
+                assert res.status_code == 422, res.text
+            assert len((await client.get("/items/")).json()) == before
+
+
+def test_render_clamps_crop_to_base_image():
+    """Dimensions beyond the base image are clamped instead of allocating a padded raster"""
+    base = load_base_image()
+    assert crop_size(base.width * 2, base.height * 2) == (base.width, base.height)
+    assert crop_size(10.7, 20.2) == (10, 20)
+
+
+# --- FILTERS ---
+@pytest.mark.asyncio
+async def test_read_items_filtered_by_material_and_product_type():
+    """The list can be narrowed by material and product type and is ordered by id"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            other_material_id, other_pt_id = await create_refs(client)
+            ids = []
+            for m, p in ((material_id, pt_id), (material_id, other_pt_id), (other_material_id, pt_id)):
+                res = await client.post("/items/", json={"material_id": m, "product_type_id": p, "width": 10, "height": 10})
+                ids.append(res.json()["id"])
+
+            res = await client.get("/items/", params={"material_id": material_id})
+            assert [item["id"] for item in res.json()] == ids[:2]
+            res = await client.get("/items/", params={"product_type_id": pt_id})
+            assert [item["id"] for item in res.json()] == [ids[0], ids[2]]
+            res = await client.get("/items/", params={"material_id": material_id, "product_type_id": pt_id})
+            assert [item["id"] for item in res.json()] == [ids[0]]
+
+            for item_id in ids:
+                await client.delete(f"/items/{item_id}")
+
+
+# --- STATS ---
+@pytest.mark.asyncio
+async def test_item_stats_grouped_and_refreshed_after_ttl(monkeypatch):
+    """/items/stats aggregates per material and product type; writes show up once the cache expires"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            _, other_pt_id = await create_refs(client)
+            for width, height, product_type_id in ((10, 20, pt_id), (30, 40, pt_id), (50, 60, other_pt_id)):
+                res = await client.post("/items/", json={
+                    "material_id": material_id, "product_type_id": product_type_id, "width": width, "height": height,
+                })
+                assert res.status_code == 200, res.text
+
+            res = await client.get("/items/stats")
+            assert res.status_code == 200, res.text
+            stats = res.json()
+            material = next(g for g in stats["by_material"] if g["material_id"] == material_id)
+            assert material["count"] == 3
+            assert material["width"] == {"sum": 90, "min": 10, "max": 50, "avg": 30}
+            assert material["area"]["sum"] == 10 * 20 + 30 * 40 + 50 * 60
+            product_type = next(g for g in stats["by_product_type"] if g["product_type_id"] == pt_id)
+            assert product_type["count"] == 2
+            assert product_type["height"]["max"] == 40
+            assert stats["total"]["count"] >= 3
+
+            item_id = (await client.get("/items/", params={"product_type_id": other_pt_id})).json()[0]["id"]
+            await client.delete(f"/items/{item_id}")
+            stats = (await client.get("/items/stats")).json()
+            material = next(g for g in stats["by_material"] if g["material_id"] == material_id)
+            assert material["count"] == 3
+
+            monkeypatch.setattr(item_stats, "ttl_seconds", 0)
+            stats = (await client.get("/items/stats")).json()
+            material = next(g for g in stats["by_material"] if g["material_id"] == material_id)
+            assert material["count"] == 2
+            assert material["width"]["max"] == 30
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stats_misses_share_one_query():
+    """Requests that miss the stats cache together wait for a single grouped query"""
+    queries = []
+
+    class SlowResult:
+        def all(self):
+            return [(1, 1, 2, 30.0, 10.0, 20.0, 30.0, 10.0, 20.0, 450.0, 100.0, 350.0)]
+
+    class SlowSession:
+        async def execute(self, statement):
+            queries.append(statement)
+            await asyncio.sleep(0.05)
+            return SlowResult()
+
+    cache = StatsCache(ttl_seconds=30)
+    bodies = await asyncio.gather(*(cache.refresh(SlowSession()) for _ in range(5)))
+    assert len(queries) == 1
+    assert len(set(bodies)) == 1
+    assert cache.get() == bodies[0]
+
+
+# --- BATCH LAYOUT ---
+@pytest.mark.asyncio
+async def test_layout_renders_items_onto_shared_sheets():
+    """POST /items/layout packs the items into one PDF embedding the base image only once"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id, pt_id = await create_refs(client)
+            item_ids = []
+            for width, height in ((200, 150), (300, 100), (120, 400), (500, 500)):
+                res = await client.post("/items/", json={
+                    "material_id": material_id, "product_type_id": pt_id, "width": width, "height": height,
+                })
+                item_ids.append(res.json()["id"])
+
+            res = await client.post("/items/layout", json={"item_ids": item_ids, "sheet_width": 600,
+                                                           "sheet_height": 700, "margin": 10, "gap": 5})
+            assert res.status_code == 200, res.text
+            assert res.headers["content-type"] == "application/pdf"
+            assert res.content.startswith(b"%PDF")
+            assert int(res.headers["x-layout-pages"]) == 2
+            assert res.content.count(b"/Subtype /Image") == 1
+
+            res = await client.post("/items/layout", json={"item_ids": [*item_ids, 99999999]})
+            assert res.status_code == 404
+
+            res = await client.post("/items/layout", json={"item_ids": item_ids, "sheet_width": 300,
+                                                           "sheet_height": 300})
+            assert res.status_code == 422
+            assert str(item_ids[3]) in res.json()["detail"]
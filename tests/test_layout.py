@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from app.render.layout import pack
+
+
+def overlaps(layout, page):
+    idx = np.flatnonzero(layout.page == page)
+    x0, y0 = layout.x[idx], layout.y[idx]
+    x1, y1 = x0 + layout.width[idx], y0 + layout.height[idx]
+    hit = (x0[:, None] < x1[None, :]) & (x0[None, :] < x1[:, None]) & (y0[:, None] < y1[None, :]) & (y0[None, :] < y1[:, None])
+    np.fill_diagonal(hit, False)
+    return hit.any()
+
+
+def test_pack_places_items_inside_margins_without_overlap():
+    """Every placement lies inside the sheet margins and no two crops on a page overlap"""
+    rng = np.random.default_rng(7)
+    widths, heights = rng.uniform(5, 300, 1500), rng.uniform(5, 300, 1500)
+    layout = pack(widths, heights, 842, 1191, margin=20, gap=5)
+
+    assert layout.pages > 1
+    assert (layout.x >= 20).all() and (layout.x + widths <= 842 - 20 + 1e-9).all()
+    assert (layout.y >= 20 - 1e-9).all() and (layout.y + heights <= 1191 - 20 + 1e-9).all()
+    for page in range(layout.pages):
+        assert not overlaps(layout, page)
+
+
+def test_pack_keeps_input_order_for_results():
+    """Placements are reported per input item, tallest items starting at the top-left"""
+    layout = pack([100, 100, 100], [50, 200, 100], 400, 400)
+    assert layout.pages == 1
+    assert (layout.x[1], layout.y[1]) == (0, 200)  # tallest first
+    assert (layout.x[2], layout.y[2]) == (100, 300)
+    assert (layout.x[0], layout.y[0]) == (200, 350)
+
+
+def test_pack_rejects_items_larger_than_the_sheet():
+    """An item that cannot fit on an empty sheet is an error, not an endless page loop"""
+    with pytest.raises(ValueError):
+        pack([500], [10], 400, 400)
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from asgi_lifespan import LifespanManager
+from sqlalchemy import select
+from app.main import app
+from app.api import items as items_api
+from app.config.config import settings
+from app.db import models
+from app.db.database import async_session_maker
+from app.jobs import jobs
+from app.lifecycle import lifecycle
+from app.render.scheduler import render_scheduler
+from app.storage import get_storage
+
+
+async def create_item(client, **dims):
+    material = await client.post("/materials/", json={"name": f"Mat_{uuid.uuid4().hex[:6]}"})
+    product_type = await client.post("/product-types/", json={"name": f"Type_{uuid.uuid4().hex[:6]}"})
+    res = await client.post("/items/", json={
+        "material_id": material.json()["id"], "product_type_id": product_type.json()["id"], **dims,
+    })
+    assert res.status_code == 200, res.text
+    return res.json()
+
+
+async def wait_for_resume():
+    for job in jobs.running():
+        if job.name == "resume renders":
+            await jobs.wait(job.id)
+
+
+@pytest.mark.asyncio
+async def test_readyz_reports_lifecycle_state():
+    """/readyz is 200 while serving and 503 once draining, and draining refuses new renders"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            res = await client.get("/readyz")
+            assert res.status_code == 200
+            assert res.json()["status"] == "ready"
+
+            lifecycle.begin_drain()
+            try:
+                res = await client.get("/readyz")
+                assert res.status_code == 503
+                assert res.json()["status"] == "draining"
+
+                res = await client.post("/items/", json={"material_id": 1, "product_type_id": 1,
+                                                         "width": 10, "height": 10})
+                assert res.status_code == 503
+                assert "Retry-After" in res.headers
+                # Reads are still served
+                assert (await client.get("/materials/")).status_code == 200
+            finally:
+                lifecycle.mark_ready()
+
+    assert lifecycle.state == "stopped"
+
+
+@pytest.mark.asyncio
+async def test_unfinished_render_is_persisted_and_resumed_on_boot(monkeypatch):
+    """A debounced render cut off by the drain deadline stays in render_jobs and finishes on the next boot"""
+    async def stuck_store_pdf(key, width, height):
+        await asyncio.sleep(60)
+
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            item = await create_item(client, width=50, height=40)
+            monkeypatch.setattr(items_api, "store_pdf", stuck_store_pdf)
+            monkeypatch.setattr(render_scheduler, "debounce_seconds", 0.01)
+            monkeypatch.setattr(settings, "SHUTDOWN_DRAIN_SECONDS", 0.2)
+            res = await client.put(f"/items/{item['id']}", json={**item, "width": 70})
+            assert res.status_code == 200, res.text
+            new_pdf = res.json()["pdf_path"]
+
+    async with async_session_maker() as session:
+        pending = (await session.execute(
+            select(models.RenderJob).where(models.RenderJob.item_id == item["id"])
+        )).scalars().all()
+    assert [job.pdf_key for job in pending] == [new_pdf]
+    assert render_scheduler.pending() == 0
+
+    monkeypatch.undo()
+    async with LifespanManager(app):
+        await wait_for_resume()
+        assert await get_storage().exists(new_pdf)
+        async with async_session_maker() as session:
+            left = await session.scalar(select(models.RenderJob.id).where(models.RenderJob.item_id == item["id"]))
+        assert left is None
+
+
+@pytest.mark.asyncio
+async def test_interrupted_create_gets_its_pdf_on_boot():
+    """An item left with a NULL pdf_path and a render job is completed when the app starts"""
+    async with async_session_maker() as session:
+        material = models.Material(name=f"Mat_{uuid.uuid4().hex[:6]}")
+        product_type = models.ProductType(name=f"Type_{uuid.uuid4().hex[:6]}")
+        session.add_all([material, product_type])
+        await session.flush()
+        db_item = models.Item(material_id=material.id, product_type_id=product_type.id, width=30, height=20)
+        session.add(db_item)
+        await session.flush()
+        key = f"item_{db_item.id}_resumed.pdf"
+        session.add(models.RenderJob(item_id=db_item.id, pdf_key=key, width=30, height=20))
+        await session.commit()
+
+    async with LifespanManager(app):
+        await wait_for_resume()
+        async with async_session_maker() as session:
+            pdf_path = await session.scalar(select(models.Item.pdf_path).where(models.Item.id == db_item.id))
+        assert pdf_path == key
+        assert await get_storage().exists(key)
@@ -1,9 +1,15 @@
+import asyncio
 import pytest
 import uuid
 from httpx import AsyncClient, ASGITransport
 from asgi_lifespan import LifespanManager
 from app.main import app
-from app.db.database import engine, Base
+from app.config.config import settings
+from sqlalchemy import func, select
+from app.db import models
+from app.db.database import async_session_maker, engine, Base
+from app.jobs import Job
+from app.jobs.cascade import cascade_delete
 
 
 
@@ -319,6 +325,120 @@ async def test_delete_nonexistent_material():
             assert res.status_code == 404, f"Expected 404, got {res.status_code}"
 
 
+@pytest.mark.asyncio
+async def test_delete_material_in_use():
+    """Deleting a material still referenced by items is refused with 409 and leaves everything in place"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id = (await client.post("/materials/", json={"name": f"Mat_{uuid.uuid4().hex[:6]}"})).json()["id"]
+            pt_id = (await client.post("/product-types/", json={"name": f"Type_{uuid.uuid4().hex[:6]}"})).json()["id"]
+            item = (await client.post("/items/", json={
+                "material_id": material_id, "product_type_id": pt_id, "width": 30, "height": 20,
+            })).json()
+
+            res = await client.delete(f"/materials/{material_id}")
+            print(f"Delete In Use Response: {res.text}")
+            assert res.status_code == 409, res.text
+
+            assert (await client.get(f"/materials/{material_id}")).status_code == 200
+            assert (await client.get(f"/items/{item['id']}")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_delete_material_cascade():
+    """cascade=true deletes the referencing items in a background job whose progress is reported at /jobs/{id}"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id = (await client.post("/materials/", json={"name": f"Mat_{uuid.uuid4().hex[:6]}"})).json()["id"]
+            pt_id = (await client.post("/product-types/", json={"name": f"Type_{uuid.uuid4().hex[:6]}"})).json()["id"]
+            item_ids = []
+            for _ in range(3):
+                res = await client.post("/items/", json={
+                    "material_id": material_id, "product_type_id": pt_id, "width": 30, "height": 20,
+                })
+                item_ids.append(res.json()["id"])
+
+            res = await client.delete(f"/materials/{material_id}", params={"cascade": "true"})
+            print(f"Cascade Delete Response: {res.text}")
+            assert res.status_code == 202, res.text
+            status_url = res.json()["status_url"]
+
+            for _ in range(100):
+                job = (await client.get(status_url)).json()
+                if job["status"] in ("completed", "failed"):
+                    break
+                await asyncio.sleep(0.05)
+
+            assert job["status"] == "completed", job
+            assert job["total"] == 3
+            assert job["processed"] == 3
+            assert (await client.get(f"/materials/{material_id}")).status_code == 404
+            for item_id in item_ids:
+                assert (await client.get(f"/items/{item_id}")).status_code == 404
+            # The product type is untouched and now free to delete
+            assert (await client.delete(f"/product-types/{pt_id}")).status_code == 200
+
+
+async def unfinished_cascade(item_count: int) -> tuple[str, int]:
+    """A material with items and the cascade_jobs row a crashed worker left halfway through."""
+    async with async_session_maker() as session:
+        material = models.Material(name=f"Mat_{uuid.uuid4().hex[:6]}")
+        session.add(material)
+        await session.flush()
+        session.add_all([models.Item(material_id=material.id, width=10, height=10) for _ in range(item_count)])
+        job_id = uuid.uuid4().hex
+        session.add(models.CascadeJob(id=job_id, entity="material", parent_id=material.id, status="running",
+                                      owner="crashed", total=item_count + 2, processed=2))
+        await session.commit()
+        return job_id, material.id
+
+
+async def wait_for_job(client, job_id: str) -> dict:
+    for _ in range(100):
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    return job
+
+
+@pytest.mark.asyncio
+async def test_unfinished_cascade_resumes_on_boot():
+    """A cascade left running by a previous process continues on startup and keeps its progress"""
+    job_id, material_id = await unfinished_cascade(item_count=3)
+
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            job = await wait_for_job(client, job_id)
+            assert job["status"] == "completed", job
+            assert job["total"] == 5
+            assert job["processed"] == 5
+            assert (await client.get(f"/materials/{material_id}")).status_code == 404
+            assert (await client.get("/items/", params={"material_id": material_id})).json() == []
+
+
+@pytest.mark.asyncio
+async def test_cascade_is_run_by_one_worker_at_a_time():
+    """Two runs of the same cascade job do not both delete; the one that lost the claim stops"""
+    job_id, material_id = await unfinished_cascade(item_count=2)
+
+    runs = [Job(id=job_id, name="delete material"), Job(id=job_id, name="delete material")]
+    await asyncio.gather(*(cascade_delete(run, async_session_maker, job_id) for run in runs))
+
+    async with async_session_maker() as session:
+        deletes = (await session.execute(
+            select(models.ChangeLog.entity, func.count()).where(models.ChangeLog.op == "deleted")
+            .group_by(models.ChangeLog.entity)
+        )).all()
+        cascade = await session.get(models.CascadeJob, job_id)
+    assert dict(deletes) == {"material": 1, "item": 2}
+    assert cascade.status == "completed"
+    assert cascade.processed == 4
+
+
 @pytest.mark.asyncio
 async def test_material_complete_crud_flow():
     """Test complete CRUD flow for a material"""
@@ -442,4 +562,48 @@ async def test_multiple_materials_creation():
             for name in created_names:
                 assert name in returned_names, f"{name} not found in returned materials"
 
-            print(f"✅ Successfully created {len(created_ids)} materials")
\ No newline at end of file
+            print(f"✅ Successfully created {len(created_ids)} materials")
+
+@pytest.mark.asyncio
+async def test_search_materials_by_prefix():
+    """Search matches name prefixes case-insensitively and follows creates, renames and deletes"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            tag = uuid.uuid4().hex[:6]
+            first = (await client.post("/materials/", json={"name": f"Srch{tag} Oak"})).json()
+            await client.post("/materials/", json={"name": f"Srch{tag} Pine"})
+            await client.post("/materials/", json={"name": f"Other{tag}"})
+
+            res = await client.get("/materials/search", params={"q": f"srch{tag}"})
+            assert res.status_code == 200, res.text
+            assert [m["name"] for m in res.json()] == [f"Srch{tag} Oak", f"Srch{tag} Pine"]
+
+            res = await client.get("/materials/search", params={"q": f"Srch{tag}", "limit": 1})
+            assert len(res.json()) == 1
+
+            await client.put(f"/materials/{first['id']}", json={"name": f"Renamed{tag}"})
+            res = await client.get("/materials/search", params={"q": f"Srch{tag}"})
+            assert [m["name"] for m in res.json()] == [f"Srch{tag} Pine"]
+            res = await client.get("/materials/search", params={"q": f"Renamed{tag}"})
+            assert [m["id"] for m in res.json()] == [first["id"]]
+
+            await client.delete(f"/materials/{first['id']}")
+            res = await client.get("/materials/search", params={"q": f"Renamed{tag}"})
+            assert res.json() == []
+
+
+@pytest.mark.asyncio
+async def test_search_materials_database_fallback(monkeypatch):
+    """With the index disabled, search runs a LIKE 'q%' query that treats wildcards literally"""
+    monkeypatch.setattr(settings, "SEARCH_INDEX_ENABLED", False)
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            tag = uuid.uuid4().hex[:6]
+            await client.post("/materials/", json={"name": f"Pct{tag}_a"})
+            await client.post("/materials/", json={"name": f"Pct{tag}xa"})
+
+            res = await client.get("/materials/search", params={"q": f"Pct{tag}_"})
+            assert res.status_code == 200, res.text
+            assert [m["name"] for m in res.json()] == [f"Pct{tag}_a"]
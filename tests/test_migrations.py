@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, func, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.config.config import settings
+
+MIGRATIONS = Path(__file__).parent.parent / "migrations"
+
+pytestmark = [
+    pytest.mark.skipif(settings.DB_BACKEND != "mysql", reason="migrations are MySQL DDL; run with TEST_DB_BACKEND=mysql"),
+    pytest.mark.real_transactions,
+]
+
+# The schema create_all produced before 0001, which the migration starts from
+baseline = MetaData()
+Table("users", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("username", String(50), unique=True, index=True, nullable=False),
+      Column("hashed_password", String(255), nullable=False))
+Table("materials", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("name", String(100), unique=True, nullable=False),
+      Column("description", String(255)))
+Table("product_types", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("name", String(100), unique=True, nullable=False),
+      Column("description", String(255)))
+Table("items", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("material_id", Integer, ForeignKey("materials.id")),
+      Column("product_type_id", Integer, ForeignKey("product_types.id")),
+      Column("width", Float, nullable=False),
+      Column("height", Float, nullable=False),
+      Column("pdf_path", String(255)))
+Table("token_sessions", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+      Column("token", String(255), unique=True, nullable=False),
+      Column("created_at", DateTime(timezone=True), server_default=func.now()))
+
+
+def statements(name: str) -> list[str]:
+    """The migration's statements, one per ``;``, without comments."""
+    sql = "\n".join(line for line in (MIGRATIONS / name).read_text().splitlines() if not line.lstrip().startswith("--"))
+    return [statement.strip() for statement in sql.split(";") if statement.strip()]
+
+
+async def indexes(conn) -> dict[str, set[str]]:
+    rows = await conn.execute(text(
+        "SELECT DISTINCT table_name, index_name FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND index_name != 'PRIMARY'"
+    ))
+    result = {}
+    for table, index in rows:
+        result.setdefault(table, set()).add(index)
+    return result
+
+
+@pytest.mark.asyncio
+async def test_query_indexes_migration_applies_and_reverts():
+    """0001 runs to completion on a pre-migration schema and its down script restores the original indexes"""
+    name = f"{settings.DB_NAME}_migration"
+    server = create_async_engine(settings.DATABASE_URL.rsplit("/", 1)[0])
+    async with server.begin() as conn:
+        await conn.execute(text(f"DROP DATABASE IF EXISTS `{name}`"))
+        await conn.execute(text(f"CREATE DATABASE `{name}`"))
+    await server.dispose()
+
+    scratch = create_async_engine(f"{settings.DATABASE_URL.rsplit('/', 1)[0]}/{name}")
+    try:
+        async with scratch.begin() as conn:
+            await conn.run_sync(baseline.create_all)
+        async with scratch.connect() as conn:
+            before = await indexes(conn)
+            assert {"material_id", "product_type_id"} <= before["items"]
+
+            for statement in statements("0001_query_indexes.up.sql"):
+                await conn.exec_driver_sql(statement)
+            after = await indexes(conn)
+            assert after["items"] == {"ix_items_material_id_id", "ix_items_product_type_id_id", "ix_items_pdf_path"}
+            assert after["token_sessions"] == {"token", "ix_token_sessions_user_id"}
+            assert "ix_users_id" not in after["users"]
+
+            for statement in statements("0001_query_indexes.down.sql"):
+                await conn.exec_driver_sql(statement)
+            assert await indexes(conn) == before
+    finally:
+        async with scratch.begin() as conn:
+            await conn.execute(text(f"DROP DATABASE `{name}`"))
+        await scratch.dispose()
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from app.db.prefix_index import PrefixIndex, like_prefix
+
+
+class SlowSession:
+    """Returns fixed rows after a delay, standing in for the load query"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, statement):
+        await asyncio.sleep(0.01)
+        return self
+
+    def all(self):
+        return self.rows
+
+
+@pytest.mark.asyncio
+async def test_writes_during_a_build_are_not_lost():
+    """Upserts and removes that land while the index is loading are replayed onto the new build"""
+    index = PrefixIndex(load_statement=None, refresh_seconds=60)
+    loading = asyncio.create_task(index.ensure_loaded(SlowSession([(1, "Oak", None), (2, "Olive", None)])))
+    await asyncio.sleep(0)
+    index.upsert((3, "Onyx", None))
+    index.remove(2)
+    await loading
+
+    assert [row[0] for row in index.search("o", 10)] == [1, 3]
+
+
+def test_like_prefix_escapes_wildcards():
+    """Wildcards in the query match literally"""
+    assert like_prefix("50%_off") == "50\\%\\_off%"
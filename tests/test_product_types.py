@@ -85,3 +85,41 @@ async def test_delete_product_type():
             print("DELETE:", res.text)
             assert res.status_code == 200
             assert res.json()["detail"] == "Product type deleted"
+
+
+@pytest.mark.asyncio
+async def test_delete_product_type_in_use():
+    """A product type referenced by items cannot be deleted without cascade"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            material_id = (await client.post("/materials/", json={"name": f"Mat_{uuid.uuid4().hex[:6]}"})).json()["id"]
+            pt_id = (await client.post("/product-types/", json={"name": f"Type_{uuid.uuid4().hex[:6]}"})).json()["id"]
+            await client.post("/items/", json={
+                "material_id": material_id, "product_type_id": pt_id, "width": 30, "height": 20,
+            })
+
+            res = await client.delete(f"/product-types/{pt_id}")
+            print("DELETE IN USE:", res.text)
+            assert res.status_code == 409
+            assert (await client.get(f"/product-types/{pt_id}")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_search_product_types_by_prefix():
+    """Product type search returns prefix matches and drops deleted types"""
+    async with LifespanManager(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            tag = uuid.uuid4().hex[:6]
+            chair = (await client.post("/product-types/", json={"name": f"Seat{tag} Chair"})).json()
+            await client.post("/product-types/", json={"name": f"Seat{tag} Stool"})
+
+            res = await client.get("/product-types/search", params={"q": f"SEAT{tag}"})
+            print("SEARCH:", res.text)
+            assert res.status_code == 200
+            assert [pt["name"] for pt in res.json()] == [f"Seat{tag} Chair", f"Seat{tag} Stool"]
+
+            await client.delete(f"/product-types/{chair['id']}")
+            res = await client.get("/product-types/search", params={"q": f"Seat{tag}"})
+            assert [pt["name"] for pt in res.json()] == [f"Seat{tag} Stool"]
@@ -0,0 +1,149 @@
+import time
+from types import SimpleNamespace
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.middleware import rate_limit
+from app.middleware.admission import AdmissionController, AdmissionMiddleware
+from app.middleware.rate_limit import InMemoryTokenBucket, RateLimitMiddleware, RedisTokenBucket, RouteCost
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/cheap")
+    async def cheap():
+        return {"ok": True}
+
+    @app.post("/items/")
+    async def expensive():
+        return {"ok": True}
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_charges_route_costs():
+    """Expensive routes drain the bucket faster and exhausted clients get 429 with Retry-After"""
+    app = build_app()
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=InMemoryTokenBucket(),
+        rate=0.001,
+        burst=10,
+        costs=[RouteCost(frozenset({"POST"}), r"/items/?", 5)],
+    )
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/items/")).status_code == 200
+        assert (await client.post("/items/")).status_code == 200
+        res = await client.post("/items/")
+        assert res.status_code == 429
+        assert int(res.headers["retry-after"]) >= 1
+        assert (await client.get("/cheap")).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_buckets_are_per_client():
+    """Each client identity has its own bucket"""
+    backend = InMemoryTokenBucket()
+    assert await backend.take("ip:1", 10, rate=1, capacity=10) == 0
+    assert await backend.take("ip:1", 1, rate=1, capacity=10) > 0
+    assert await backend.take("ip:2", 10, rate=1, capacity=10) == 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock the Redis backend passes to its script, advanced by hand."""
+    now = {"value": 1_700_000_000.0}
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: now["value"], monotonic=time.monotonic))
+    return now
+
+
+@pytest.mark.asyncio
+async def test_redis_bucket_bursts_denies_and_refills(clock):
+    """The Lua script allows a burst, reports the wait when empty and refills at the rate"""
+    redis = FakeRedis()
+    backend = RedisTokenBucket(redis)
+    for _ in range(3):
+        assert await backend.take("ip:1", 1, rate=2, capacity=3) == 0
+    assert await backend.take("ip:1", 1, rate=2, capacity=3) == 0.5
+    assert await backend.take("ip:1", 2, rate=2, capacity=3) == 1.0
+
+    clock["value"] += 0.5
+    assert await backend.take("ip:1", 1, rate=2, capacity=3) == 0
+    assert await backend.take("ip:1", 1, rate=2, capacity=3) == 0.5
+
+    # Refill stops at capacity however long the client was idle
+    clock["value"] += 60
+    for _ in range(3):
+        assert await backend.take("ip:1", 1, rate=2, capacity=3) == 0
+    assert await backend.take("ip:1", 1, rate=2, capacity=3) > 0
+
+    assert await backend.take("ip:2", 3, rate=2, capacity=3) == 0
+    assert 0 < await redis.ttl("ratelimit:ip:1") <= 3
+
+
+@pytest.mark.asyncio
+async def test_redis_buckets_are_shared_between_workers(clock):
+    """Two limiters on one Redis server draw from the same budget"""
+    server = FakeServer()
+    app = build_app()
+    app.add_middleware(RateLimitMiddleware, backend=RedisTokenBucket(FakeRedis(server=server)), rate=0.001, burst=2)
+    other = build_app()
+    other.add_middleware(RateLimitMiddleware, backend=RedisTokenBucket(FakeRedis(server=server)), rate=0.001, burst=2)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as first, \
+            AsyncClient(transport=ASGITransport(app=other), base_url="http://test") as second:
+        assert (await first.get("/cheap")).status_code == 200
+        assert (await second.get("/cheap")).status_code == 200
+        res = await first.get("/cheap")
+        assert res.status_code == 429
+        assert int(res.headers["retry-after"]) >= 1
+        assert (await second.get("/cheap")).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_render_routes_when_queue_is_full():
+    """Render-bound routes get 503 while the render queue is deep; cheap routes still pass"""
+    depth = {"value": 0}
+    app = build_app()
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            render_queue_depth=lambda: depth["value"],
+            pool_wait_seconds=lambda: 0.0,
+            max_render_queue=4,
+            max_pool_wait_seconds=0.5,
+            retry_after_seconds=2,
+        ),
+        render_routes=[RouteCost(frozenset({"POST"}), r"/items/?", 1)],
+    )
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/items/")).status_code == 200
+        depth["value"] = 4
+        res = await client.post("/items/")
+        assert res.status_code == 503
+        assert res.headers["retry-after"] == "2"
+        assert (await client.get("/cheap")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_everything_when_pool_waits_are_high():
+    """Any request is refused while DB connection waits exceed the threshold"""
+    app = build_app()
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            render_queue_depth=lambda: 0,
+            pool_wait_seconds=lambda: 1.0,
+            max_render_queue=4,
+            max_pool_wait_seconds=0.5,
+        ),
+    )
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/cheap")).status_code == 503
@@ -0,0 +1,77 @@
+import os
+import time
+import uuid
+import pytest
+from asgi_lifespan import LifespanManager
+from app.main import app
+from app.db import models
+from app.db.database import async_session_maker
+from app.storage import S3Storage, ShardedLocalStorage
+from app.storage.reconcile import reconcile_storage
+from app.render.renderer import RenderVariant, variant_key
+from tests.test_storage import FakeS3Client
+
+
+@pytest.mark.asyncio
+async def test_reconcile_removes_orphans_and_stale_temp_files(tmp_path):
+    """Unreferenced PDFs and old temp files are deleted, referenced, recent and foreign files are kept"""
+    async with LifespanManager(app):
+        storage = ShardedLocalStorage(str(tmp_path))
+        base = uuid.uuid4().int % 10**8
+        referenced, legacy, orphan, fresh = (f"item_{base + n}_20240101_120000.pdf" for n in range(4))
+        foreign = f"report_{base}.pdf"
+        for key in (referenced, legacy, orphan, fresh, foreign):
+            await storage.put(key, b"x" * 10)
+        (tmp_path / f"temp_{base}.jpg").write_bytes(b"y" * 5)
+
+        old = time.time() - 7200
+        for key in (referenced, legacy, orphan, foreign):
+            os.utime(storage.shard_path(key), (old, old))
+        os.utime(tmp_path / f"temp_{base}.jpg", (old, old))
+
+        async with async_session_maker() as session:
+            item = models.Item(width=1, height=1, pdf_path=referenced)
+            session.add_all([item, models.Item(width=1, height=1, pdf_path=f"app/generated_pdfs/{legacy}")])
+            await session.commit()
+
+        # Cached variants survive while the item's dimensions match, stale ones are orphans
+        current_variant = variant_key(item.id, 1, 1, RenderVariant.thumbnail_png)
+        stale_variant = variant_key(item.id, 2, 2, RenderVariant.thumbnail_png)
+        for key in (current_variant, stale_variant):
+            await storage.put(key, b"z" * 10)
+            os.utime(storage.shard_path(key), (old, old))
+
+        report = await reconcile_storage(storage, async_session_maker, batch_size=2)
+
+        assert report.scanned == 8
+        assert report.referenced == 3
+        assert report.skipped_recent == 1
+        assert report.skipped_foreign == 1
+        assert report.orphans_deleted == 2
+        assert report.temp_deleted == 1
+        assert report.bytes_reclaimed == 25
+        assert await storage.exists(referenced)
+        assert await storage.exists(legacy)
+        assert await storage.exists(fresh)
+        assert not await storage.exists(orphan)
+        assert await storage.exists(foreign)
+        assert await storage.exists(current_variant)
+        assert not await storage.exists(stale_variant)
+        assert not (tmp_path / f"temp_{base}.jpg").exists()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_leaves_other_objects_in_a_shared_bucket_alone():
+    """Without S3_PREFIX only this app's keys at the bucket root are candidates for deletion"""
+    client = FakeS3Client()
+    storage = S3Storage(bucket="shared", client=client)
+    orphan = "item_424242_20240101_120000.pdf"
+    others = ["backup.tar", "reports/item_1_20240101_120000.pdf", "temp_notes.jpg"]
+    for key in (orphan, *others):
+        client.put_object(Bucket="shared", Key=key, Body=b"x" * 10, ContentType="application/octet-stream")
+
+    report = await reconcile_storage(storage, async_session_maker, grace_seconds=0)
+
+    assert report.orphans_deleted == 1
+    assert report.skipped_foreign == 2
+    assert sorted(key for _, key in client.objects) == sorted(others)
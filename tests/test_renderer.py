@@ -0,0 +1,93 @@
+import asyncio
+import subprocess
+import sys
+import pytest
+from app.render.renderer import single_flight
+from app.render.scheduler import RenderScheduler
+
+
+@pytest.mark.asyncio
+async def test_single_flight_runs_once_for_concurrent_callers():
+    """Concurrent callers for one key share a single execution"""
+    calls = 0
+
+    async def produce():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[single_flight("k-once", produce) for _ in range(5)])
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_waiter_takes_over_when_leader_is_cancelled():
+    """Cancelling the leader does not cancel waiters; one of them produces instead"""
+    started = asyncio.Event()
+    produced_by = []
+
+    async def slow_produce():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def produce():
+        produced_by.append("waiter")
+
+    leader = asyncio.create_task(single_flight("k-cancel", slow_produce))
+    await started.wait()
+    waiter = asyncio.create_task(single_flight("k-cancel", produce))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    await asyncio.wait_for(waiter, timeout=1)
+    assert produced_by == ["waiter"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_coalesces_and_runs_all_after_callbacks():
+    """Only the last produce in a debounce window runs; every call's cleanup still runs after it"""
+    scheduler = RenderScheduler(debounce_seconds=0.05)
+    produced, cleaned = [], []
+
+    def make(n):
+        async def produce():
+            produced.append(n)
+
+        async def after():
+            cleaned.append(n)
+        return produce, after
+
+    for n in range(3):
+        scheduler.schedule("item", *make(n))
+    await asyncio.sleep(0.15)
+
+    assert produced == [2]
+    assert cleaned == [0, 1, 2]
+    assert scheduler.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_flush_runs_pending_render_immediately():
+    """flush() does not wait out the debounce window"""
+    scheduler = RenderScheduler(debounce_seconds=60)
+    produced = []
+
+    async def produce():
+        produced.append(True)
+
+    scheduler.schedule("item", produce)
+    await asyncio.wait_for(scheduler.flush("item"), timeout=1)
+    assert produced == [True]
+
+
+def test_item_pdf_bytes_do_not_depend_on_import_order():
+    """An item PDF rendered without the layout module imported still uses binary image streams"""
+    script = (
+        "import sys; from app.render.renderer import render_pdf; "
+        "pdf = render_pdf(50, 50); "
+        "assert 'app.render.layout' not in sys.modules; "
+        "assert b'ASCII85Decode' not in pdf"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
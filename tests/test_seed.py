@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import func, select
+from jose import jwt
+from app.config.config import settings
+from app.db import models
+from app.db.database import engine
+from app.db.seed import SeedConfig, seed
+
+
+@pytest.mark.asyncio
+@pytest.mark.real_transactions
+async def test_seed_bulk_loads_configured_volumes():
+    """The seeder adds exactly the configured rows, with item dimensions inside the accepted bounds"""
+    config = SeedConfig(materials=3, product_types=2, items=250, users=4, tokens_per_user=2, chunk_size=100)
+
+    async def counts():
+        async with engine.connect() as conn:
+            return {
+                model: (await conn.execute(select(func.count()).select_from(model))).scalar()
+                for model in (models.Material, models.ProductType, models.Item, models.User, models.TokenSession)
+            }
+
+    try:
+        before = await counts()
+        await seed(engine, config)
+        after = await counts()
+        async with engine.connect() as conn:
+            bounds = (await conn.execute(
+                select(func.min(models.Item.width), func.max(models.Item.width),
+                       func.min(models.Item.height), func.max(models.Item.height))
+            )).one()
+        async with engine.connect() as conn:
+            token_row = (await conn.execute(
+                select(models.TokenSession.user_id, models.TokenSession.token)
+                .order_by(models.TokenSession.id.desc()).limit(1)
+            )).one()
+    finally:
+        # Used outside the app lifespan, so nothing else returns the pooled connections
+        await engine.dispose()
+
+    assert after[models.Material] - before[models.Material] == 3
+    assert after[models.ProductType] - before[models.ProductType] == 2
+    assert after[models.Item] - before[models.Item] == 250
+    assert after[models.User] - before[models.User] == 4
+    assert after[models.TokenSession] - before[models.TokenSession] == 8
+
+    assert bounds[0] > 0 and bounds[1] <= settings.ITEM_MAX_WIDTH
+    assert bounds[2] > 0 and bounds[3] <= settings.ITEM_MAX_HEIGHT
+
+    payload = jwt.decode(token_row.token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    assert payload["sub"] == str(token_row.user_id)
@@ -0,0 +1,19 @@
+import json
+from app.api.items import item_list_adapter
+from app.db.queries import ITEM_FIELDS
+from app.api.serialization import rows_response
+from app.config.config import settings
+
+
+def test_rows_response_trusted_and_validated_paths_agree(monkeypatch):
+    """Both fast-path encoders produce the same JSON as the response_model schema"""
+    rows = [(1, 2, 3, 10.5, 20.0, "item_1.pdf"), (2, 2, 3, 7.0, 8.25, None)]
+    expected = [dict(zip(ITEM_FIELDS, row)) for row in rows]
+
+    monkeypatch.setattr(settings, "FAST_PATH_VALIDATE", False)
+    trusted = rows_response(rows, ITEM_FIELDS, item_list_adapter)
+    monkeypatch.setattr(settings, "FAST_PATH_VALIDATE", True)
+    validated = rows_response(rows, ITEM_FIELDS, item_list_adapter)
+
+    assert trusted.media_type == validated.media_type == "application/json"
+    assert json.loads(trusted.body) == json.loads(validated.body) == expected
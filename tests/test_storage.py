@@ -0,0 +1,129 @@
+import io
+import os
+from datetime import datetime, timezone
+import pytest
+from app.storage import ObjectNotFound, S3Storage, ShardedLocalStorage, normalize_key
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the boto3 S3 client the driver uses."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def list_objects_v2(self, Bucket, MaxKeys, Prefix="", Delimiter=None, ContinuationToken=None):
+        names = sorted(
+            key for bucket, key in self.objects
+            if bucket == Bucket and key.startswith(Prefix)
+            and not (Delimiter and Delimiter in key[len(Prefix):])
+        )
+        start = int(ContinuationToken or 0)
+        page = names[start:start + MaxKeys]
+        contents = [
+            {"Key": key, "Size": len(self.objects[(Bucket, key)]), "LastModified": datetime.now(timezone.utc)}
+            for key in page
+        ]
+        truncated = start + MaxKeys < len(names)
+        return {"Contents": contents, "IsTruncated": truncated, "NextContinuationToken": str(start + MaxKeys)}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error("NoSuchKey")
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error("404")
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def test_normalize_key():
+    """Legacy relative paths map to bare keys, anything path-like is rejected"""
+    assert normalize_key("app/generated_pdfs/item_1.pdf") == "item_1.pdf"
+    assert normalize_key("item_1.pdf") == "item_1.pdf"
+    for bad in ("", "../item_1.pdf", "a/b.pdf", ".hidden"):
+        with pytest.raises(ValueError):
+            normalize_key(bad)
+
+
+@pytest.mark.asyncio
+async def test_local_storage_roundtrip(tmp_path):
+    """Local driver stores objects in hash shards and supports the full interface"""
+    storage = ShardedLocalStorage(str(tmp_path))
+    await storage.put("item_1.pdf", b"%PDF-data")
+
+    path = storage.shard_path("item_1.pdf")
+    assert os.path.isfile(path)
+    assert os.path.relpath(path, tmp_path).count(os.sep) == 2
+
+    assert await storage.exists("item_1.pdf")
+    assert await storage.get("item_1.pdf") == b"%PDF-data"
+    chunks = [chunk async for chunk in storage.stream("item_1.pdf", chunk_size=3)]
+    assert b"".join(chunks) == b"%PDF-data"
+
+    assert await storage.delete("item_1.pdf") is True
+    assert await storage.delete("item_1.pdf") is False
+    assert not await storage.exists("item_1.pdf")
+    with pytest.raises(ObjectNotFound):
+        await storage.get("item_1.pdf")
+
+
+@pytest.mark.asyncio
+async def test_local_storage_reads_legacy_flat_files(tmp_path):
+    """Files from the old flat layout are still readable and deletable"""
+    (tmp_path / "item_4_old.pdf").write_bytes(b"legacy")
+    storage = ShardedLocalStorage(str(tmp_path))
+
+    assert await storage.get("app/generated_pdfs/item_4_old.pdf") == b"legacy"
+    assert await storage.delete("item_4_old.pdf") is True
+    assert not (tmp_path / "item_4_old.pdf").exists()
+
+
+@pytest.mark.asyncio
+async def test_s3_storage_roundtrip():
+    """S3 driver works against an in-memory stand-in client"""
+    client = FakeS3Client()
+    storage = S3Storage(bucket="pdfs", prefix="items", client=client)
+
+    await storage.put("item_2.pdf", b"%PDF-s3", content_type="application/pdf")
+    assert ("pdfs", "items/item_2.pdf") in client.objects
+    assert await storage.exists("item_2.pdf")
+    assert await storage.get("item_2.pdf") == b"%PDF-s3"
+    chunks = [chunk async for chunk in storage.stream("item_2.pdf", chunk_size=4)]
+    assert b"".join(chunks) == b"%PDF-s3"
+
+    assert await storage.delete("item_2.pdf") is True
+    assert await storage.delete("item_2.pdf") is False
+    with pytest.raises(ObjectNotFound):
+        await storage.get("item_2.pdf")
+
+
+@pytest.mark.asyncio
+async def test_storage_listing_in_batches(tmp_path):
+    """Both drivers list every entry in bounded batches, including temp leftovers"""
+    local = ShardedLocalStorage(str(tmp_path))
+    s3 = S3Storage(bucket="pdfs", prefix="items", client=FakeS3Client())
+    for storage in (local, s3):
+        for n in range(5):
+            await storage.put(f"item_{n}.pdf", b"abc")
+
+        batches = [batch async for batch in storage.iter_objects(batch_size=2)]
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        objects = [obj for batch in batches for obj in batch]
+        assert sorted(obj.key for obj in objects) == [f"item_{n}.pdf" for n in range(5)]
+        assert all(obj.size == 3 for obj in objects)
+
+        await storage.discard(objects[0])
+        assert not await storage.exists(objects[0].key)